@@ -0,0 +1,113 @@
+# backend/capture_service.py
+import time
+import threading
+import numpy as np
+
+class CaptureService(threading.Thread):
+    """
+    背景擷取服務：以固定頻率把螢幕 (或登記的區域) 擷取到預先配置的環形緩衝區
+    消費者 (執行器 / 看門狗 / 插件) 直接取最新一張畫面的裁切副本，不必在步驟內同步擷取
+    ※ 回傳的是副本：比對 / OCR 耗時超過 buffer_size 個週期時，環形緩衝區被覆寫也不會影響消費者手上的畫面
+    """
+    def __init__(self, vision, fps=10, regions=None, buffer_size=4):
+        super().__init__(daemon=True)
+        self.vision = vision
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.buffer_size = max(2, buffer_size) # 至少兩格：寫入中的格子永遠不是最新一格
+        self.regions = list(regions) if regions else [None]
+        self.is_running = True
+
+        # 每個擷取目標一組環形緩衝區: (buffer_size, h, w, 4) 的 BGRA 畫面
+        self.targets = [vision._region_rect(r) for r in self.regions]
+        self.rings = [np.empty((self.buffer_size, t['height'], t['width'], 4), dtype=np.uint8) for t in self.targets]
+        self.stamps = [[0.0] * self.buffer_size for _ in self.targets]
+        self.latest = [-1] * len(self.targets)
+
+        self.seq = 0 # 每完成一輪擷取 +1
+        self.cond = threading.Condition()
+        self.subscribers = []
+        self.stats = {'frames': 0, 'dropped': 0, 'grab_ms': 0.0}
+
+    def run(self):
+        next_tick = time.monotonic()
+        while self.is_running:
+            start = time.monotonic()
+            try:
+                sct = self.vision._get_grabber()
+                for k, rect in enumerate(self.targets):
+                    slot = (self.latest[k] + 1) % self.buffer_size
+                    np.copyto(self.rings[k][slot], self.vision._as_bgra(sct.grab(rect)))
+                    with self.cond:
+                        self.stamps[k][slot] = time.monotonic()
+                        self.latest[k] = slot
+            except Exception as e:
+                print(f"[擷取服務] 擷取失敗: {e}")
+                time.sleep(0.5)
+
+            with self.cond:
+                self.seq += 1
+                self.stats['frames'] += 1
+                self.stats['grab_ms'] = (time.monotonic() - start) * 1000
+                self.cond.notify_all()
+            seq = self.seq
+            for callback in list(self.subscribers):
+                try: callback(seq)
+                except Exception: pass
+
+            # 擷取時間超過週期就略過錯過的拍，並記為掉幀
+            next_tick += self.interval
+            now = time.monotonic()
+            if now > next_tick:
+                missed = int((now - next_tick) / self.interval) + 1
+                self.stats['dropped'] += missed
+                next_tick += missed * self.interval
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+
+        self.vision.release_grabber()
+
+    def stop(self):
+        self.is_running = False
+        with self.cond:
+            self.cond.notify_all()
+
+    def latest_frame(self, rect, max_age=None):
+        """
+        回傳涵蓋 rect 的最新畫面裁切副本 (超過 max_age 秒或不涵蓋時回傳 None)
+        在鎖內複製：擷取執行緒只寫入下一格，且寫完才在鎖內換成最新一格，所以複製時不會被覆寫
+        """
+        now = time.monotonic()
+        with self.cond:
+            for k, target in enumerate(self.targets):
+                slot = self.latest[k]
+                if slot < 0: continue
+                if max_age is not None and now - self.stamps[k][slot] > max_age: continue
+                view = self.vision._crop(target, self.rings[k][slot], rect)
+                if view is not None: return view.copy()
+        return None
+
+    def frame_age(self):
+        """最新一張畫面距今的秒數 (尚未擷取時為 None)"""
+        with self.cond:
+            ages = [time.monotonic() - self.stamps[k][slot] for k, slot in enumerate(self.latest) if slot >= 0]
+        return min(ages) if ages else None
+
+    def subscribe(self, callback):
+        """每完成一輪擷取就在擷取執行緒呼叫 callback(seq)，請保持輕量"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers: self.subscribers.remove(callback)
+
+    def wait_frame(self, after_seq, timeout=None):
+        """等待序號大於 after_seq 的新畫面，回傳最新序號 (逾時回傳目前序號)"""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > after_seq or not self.is_running, timeout)
+            return self.seq
+
+    def get_stats(self):
+        with self.cond:
+            stats = dict(self.stats)
+        age = self.frame_age()
+        stats['age_ms'] = age * 1000 if age is not None else None
+        return stats
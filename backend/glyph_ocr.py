@@ -0,0 +1,150 @@
+# backend/glyph_ocr.py
+import os
+import cv2
+import numpy as np
+
+GLYPH_DIR = "glyphs"
+
+def _runs(mask):
+    """一維布林陣列中連續 True 的區段 [(起點, 終點), ...] (終點不含)"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[::2], edges[1::2]))
+
+class GlyphFont:
+    """
+    一套點陣字模：每個字模縮放成固定大小後攤平、正規化，疊成一個矩陣
+    分類時一次矩陣乘法算出所有字元 x 所有字模的相似度
+    """
+    SIZE = (12, 16) # (寬, 高)
+
+    def __init__(self, name, samples):
+        self.name = name
+        self.chars = [c for c, _ in samples]
+        self.heights = np.array([img.shape[0] for _, img in samples], dtype=np.float32)
+        self.aspects = np.array([img.shape[1] / img.shape[0] for _, img in samples], dtype=np.float32)
+        self.matrix = np.stack([self.vectorize(img) for _, img in samples]) if samples else np.zeros((0, self.SIZE[0] * self.SIZE[1]), np.float32)
+
+    @classmethod
+    def vectorize(cls, glyph):
+        vec = cv2.resize(glyph, cls.SIZE, interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+        vec -= vec.mean()
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def classify(self, glyphs):
+        """回傳 [(字元, 分數), ...]；分數為相關係數乘上寬高比 / 高度的相似度"""
+        if not glyphs or not self.chars: return [("?", 0.0)] * len(glyphs)
+        vectors = np.stack([self.vectorize(g) for g in glyphs])
+        scores = vectors @ self.matrix.T # (字元數, 字模數)
+        aspects = np.array([g.shape[1] / g.shape[0] for g in glyphs], dtype=np.float32)
+        heights = np.array([g.shape[0] for g in glyphs], dtype=np.float32)
+        # 縮放會抹掉形狀比例 (例如 '1' 與 '7')，用寬高比與字高差距打折
+        scores = scores * np.exp(-np.abs(np.log(aspects[:, None] / self.aspects[None, :])))
+        scores = scores * np.exp(-np.abs(np.log(heights[:, None] / self.heights[None, :])))
+        best = scores.argmax(axis=1)
+        return [(self.chars[j], float(scores[i, j])) for i, j in enumerate(best)]
+
+class GlyphOcr:
+    """
+    點陣字 OCR：遊戲固定字型的計時器 / 血量 / 座標用，不經過神經網路
+    二值化 -> 橫向投影切行 -> 縱向投影切字 -> 字模比對
+    字模存在 glyphs/<字型>/U<碼位>_<n>.png，用 learn_sample() 從截圖建立
+    回傳格式與 ocr_screen 相同: [([[x,y] x4], 文字, 信心度), ...]，每行一筆
+    """
+    def __init__(self, root=GLYPH_DIR, min_score=0.5, space_ratio=0.6):
+        self.root = root
+        self.min_score = min_score     # 低於此分數的字元以 '?' 表示
+        self.space_ratio = space_ratio # 字距超過字高的此比例視為空白
+        self.fonts = {} # 名稱 -> (目錄修改時間, GlyphFont)
+
+    def font_dir(self, font):
+        return os.path.join(self.root, font)
+
+    def load_font(self, font):
+        """載入字型 (目錄有變動才重新讀取)"""
+        path = self.font_dir(font)
+        try: mtime = os.stat(path).st_mtime_ns
+        except OSError: return None
+        cached = self.fonts.get(font)
+        if cached and cached[0] == mtime: return cached[1]
+
+        samples = []
+        for filename in sorted(os.listdir(path)):
+            if not (filename.startswith("U") and filename.lower().endswith(".png")): continue
+            try: char = chr(int(filename[1:].split("_")[0], 16))
+            except ValueError: continue
+            img = cv2.imdecode(np.fromfile(os.path.join(path, filename), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is not None: samples.append((char, img))
+        glyph_font = GlyphFont(font, samples)
+        self.fonts[font] = (mtime, glyph_font)
+        print(f"[點陣字] 載入字型 '{font}' ({len(samples)} 個字模)")
+        return glyph_font
+
+    @staticmethod
+    def binarize(gray):
+        """Otsu 二值化，並讓文字為白色前景 (前景像素較少的那一邊)"""
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if np.count_nonzero(binary) > binary.size // 2: binary = cv2.bitwise_not(binary)
+        return binary
+
+    def segment(self, binary):
+        """切成 [(行框 (x0,y0,x1,y1), [(字框, 字元影像), ...], 各字間距), ...]"""
+        lines = []
+        for y0, y1 in _runs(binary.any(axis=1)):
+            row = binary[y0:y1]
+            chars, gaps = [], []
+            last_x1 = None
+            for x0, x1 in _runs(row.any(axis=0)):
+                col = row[:, x0:x1]
+                ys = np.flatnonzero(col.any(axis=1))
+                top, bottom = y0 + ys[0], y0 + ys[-1] + 1
+                chars.append(((x0, top, x1, bottom), binary[top:bottom, x0:x1]))
+                gaps.append(0 if last_x1 is None else x0 - last_x1)
+                last_x1 = x1
+            if chars: lines.append(((chars[0][0][0], y0, chars[-1][0][2], y1), chars, gaps))
+        return lines
+
+    def read(self, gray, font="default"):
+        glyph_font = self.load_font(font)
+        if glyph_font is None or not glyph_font.chars: return []
+        if gray.ndim == 3: gray = cv2.cvtColor(gray, cv2.COLOR_BGRA2GRAY if gray.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+        results = []
+        for line_box, chars, gaps in self.segment(self.binarize(gray)):
+            x0, y0, x1, y1 = map(int, line_box)
+            labels = glyph_font.classify([img for _, img in chars])
+            text, scores = "", []
+            for (char, score), gap in zip(labels, gaps):
+                if gap > self.space_ratio * (y1 - y0): text += " "
+                text += char if score >= self.min_score else "?"
+                scores.append(score)
+            results.append(([[x0, y0], [x1, y0], [x1, y1], [x0, y1]], text, float(np.mean(scores))))
+        return results
+
+    def learn_sample(self, image, text, font="default"):
+        """
+        從一張截圖 (單行、由左到右的文字為 text) 建立字模
+        切出的字元數必須等於 text 去掉空白後的長度，否則丟出 ValueError
+        回傳新增的字模數
+        """
+        if isinstance(image, str):
+            image = cv2.imdecode(np.fromfile(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        lines = self.segment(self.binarize(gray))
+        glyphs = [img for _, chars, _ in lines for _, img in chars]
+        label = "".join(str(text).split())
+        if len(glyphs) != len(label):
+            raise ValueError(f"切出 {len(glyphs)} 個字元，但文字有 {len(label)} 個 ('{label}')")
+
+        path = self.font_dir(font)
+        os.makedirs(path, exist_ok=True)
+        existing = set(os.listdir(path))
+        for char, img in zip(label, glyphs):
+            n = 0
+            while f"U{ord(char):04X}_{n}.png" in existing: n += 1
+            filename = f"U{ord(char):04X}_{n}.png"
+            existing.add(filename)
+            cv2.imencode(".png", img)[1].tofile(os.path.join(path, filename))
+        self.fonts.pop(font, None)
+        return len(glyphs)
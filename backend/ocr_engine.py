@@ -0,0 +1,127 @@
+# backend/ocr_engine.py
+import os
+import json
+import time
+import threading
+
+OCR_CONFIG_FILE = "ocr_config.json"
+
+# gpu: True / False / "auto" (有 CUDA 才用 GPU)
+# cpu_threads: CPU 推論使用的執行緒數，0 代表交給 torch 決定
+# preload: 程式啟動時就在背景載入模型
+# workers: >0 時改用 OCR 工作行程池 (模型載入在子行程，不佔用介面的 GIL / 記憶體)
+DEFAULT_OCR_CONFIG = {
+    'languages': ['ch_tra', 'en'],
+    'gpu': "auto",
+    'cpu_threads': 0,
+    'preload': True,
+    'workers': 0,
+}
+
+class OcrEngine:
+    """
+    EasyOCR 模型的生命週期管理
+    - 背景執行緒預載模型，步驟可等待就緒 (含逾時)
+    - 依設定選擇 CPU / GPU，並可限制 CPU 執行緒數
+    - 記錄模型載入時間與每次推論耗時
+    """
+    def __init__(self, config=None):
+        self.config = dict(DEFAULT_OCR_CONFIG)
+        self.config.update(config if config is not None else self.load_config())
+        self.reader = None
+        self.error = None
+        self.device = None
+        self.load_seconds = None
+        self._loaded = threading.Event() # 載入結束 (成功或失敗) 時設定
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.stats = {'calls': 0, 'total_ms': 0.0, 'last_ms': 0.0}
+
+    @staticmethod
+    def load_config():
+        if os.path.exists(OCR_CONFIG_FILE):
+            try:
+                with open(OCR_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[OCR] ⚠️ 設定檔讀取失敗: {e}")
+        return {}
+
+    def warmup(self):
+        """在背景執行緒開始載入模型 (重複呼叫無副作用)"""
+        with self._lock:
+            if self._thread is not None: return
+            self._thread = threading.Thread(target=self._load, name="ocr-warmup", daemon=True)
+            self._thread.start()
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            print("[OCR] 正在背景載入 EasyOCR 文字辨識模型...")
+            import torch
+            import easyocr
+
+            use_gpu = self.config.get('gpu', "auto")
+            if use_gpu == "auto": use_gpu = torch.cuda.is_available()
+            threads = int(self.config.get('cpu_threads') or 0)
+            if threads > 0: torch.set_num_threads(threads)
+
+            self.reader = easyocr.Reader(self.config.get('languages', ['ch_tra', 'en']), gpu=bool(use_gpu))
+            self.device = "GPU" if use_gpu else f"CPU ({torch.get_num_threads()} 執行緒)"
+            self.load_seconds = time.perf_counter() - start
+            print(f"[OCR] ✅ 模型載入完成 ({self.device}，耗時 {self.load_seconds:.1f}s)")
+        except Exception as e:
+            self.error = e
+            print(f"[OCR] ❌ 模型載入失敗: {e}")
+        finally:
+            self._loaded.set()
+
+    def is_ready(self):
+        return self.reader is not None
+
+    def is_failed(self):
+        return self._loaded.is_set() and self.reader is None
+
+    def wait_ready(self, timeout=None):
+        """等待模型就緒 (必要時先開始載入)，成功回傳 True，逾時或失敗回傳 False"""
+        if self.reader is not None: return True
+        self.warmup()
+        self._loaded.wait(timeout)
+        return self.reader is not None
+
+    def get_reader(self, timeout=None):
+        if not self.wait_ready(timeout):
+            if self.error is not None: raise RuntimeError(f"OCR 模型載入失敗: {self.error}")
+            raise TimeoutError("等待 OCR 模型載入逾時")
+        return self.reader
+
+    def _record(self, elapsed_ms):
+        with self._stats_lock:
+            self.stats['calls'] += 1
+            self.stats['total_ms'] += elapsed_ms
+            self.stats['last_ms'] = elapsed_ms
+
+    def readtext(self, img, timeout=None, **kwargs):
+        """偵測 + 辨識 (一般用途)"""
+        reader = self.get_reader(timeout)
+        start = time.perf_counter()
+        result = reader.readtext(img, **kwargs)
+        self._record((time.perf_counter() - start) * 1000)
+        return result
+
+    def recognize(self, img, timeout=None, **kwargs):
+        """只跑辨識網路：整張圖視為一個文字框 (位置固定的欄位用，省掉文字偵測)"""
+        reader = self.get_reader(timeout)
+        start = time.perf_counter()
+        result = reader.recognize(img, **kwargs)
+        self._record((time.perf_counter() - start) * 1000)
+        return result
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['avg_ms'] = stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0
+        stats['load_seconds'] = self.load_seconds
+        stats['device'] = self.device
+        return stats
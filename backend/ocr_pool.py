@@ -0,0 +1,235 @@
+# backend/ocr_pool.py
+import time
+import queue
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+import numpy as np
+
+from backend.ocr_engine import OcrEngine
+
+def _worker_main(worker_id, config, task_q, result_q):
+    """
+    子行程主程式：只載入一次模型，之後從 task_q 取工作
+    影像透過共享記憶體傳遞 (只傳名稱 / 形狀)，結果 (框, 文字, 信心度) 才經由佇列回傳
+    """
+    engine = OcrEngine(config)
+    engine.warmup()
+    if not engine.wait_ready():
+        result_q.put(('failed', worker_id, None, str(engine.error)))
+        return
+    result_q.put(('ready', worker_id, None, engine.load_seconds))
+
+    while True:
+        task = task_q.get()
+        if task is None: break
+        job_id, shm_name, shape, method, kwargs = task
+        try:
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                img = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+                start = time.perf_counter()
+                result = getattr(engine, method)(img, **kwargs)
+                elapsed = (time.perf_counter() - start) * 1000
+                # numpy 數值轉回 Python 型別，避免回傳時夾帶整個 numpy 物件
+                result = [([[float(p[0]), float(p[1])] for p in box], text, float(conf)) for box, text, conf in result]
+                del img
+            finally:
+                shm.close()
+            result_q.put(('done', worker_id, job_id, (result, elapsed)))
+        except Exception as e:
+            result_q.put(('error', worker_id, job_id, str(e)))
+
+class _Worker:
+    def __init__(self, worker_id, process, task_q):
+        self.id = worker_id
+        self.process = process
+        self.task_q = task_q
+        self.jobs = set()   # 已派給這個行程、尚未完成的工作
+        self.ready = False
+        self.failed = False
+
+class OcrWorkerPool:
+    """
+    OCR 工作行程池：模型載入在子行程，推論不再和介面 / 執行器搶 GIL
+    - submit() 立即回傳 Future；影像放在共享記憶體，不經過 pickle
+    - 子行程當掉會自動重啟，進行中的工作重送一次 (再失敗才回報錯誤)
+    - get_stats() 提供佇列深度、平均延遲、重啟次數
+    介面與 OcrEngine 相同的部分 (warmup / wait_ready / is_ready / is_failed) 可直接給執行器使用
+    """
+    def __init__(self, workers=1, config=None, max_retries=1):
+        self.config = dict(config) if config is not None else OcrEngine.load_config()
+        self.max_retries = max_retries
+        self._ctx = mp.get_context("spawn") # Windows 只支援 spawn，其他平台也統一行為
+        self._result_q = self._ctx.Queue()
+        self._lock = threading.Lock()
+        self._jobs = {} # job_id -> {'future', 'shm', 'task', 'worker', 'start', 'retries'}
+        self._next_job = 0
+        self._ready = threading.Condition(self._lock) # 行程就緒 / 失敗 / 關閉時通知 wait_ready
+        self._workers = [self._spawn(k) for k in range(max(1, workers))]
+        self.is_running = True
+        self.stats = {'submitted': 0, 'done': 0, 'errors': 0, 'restarts': 0, 'total_ms': 0.0, 'infer_ms': 0.0}
+        self.load_seconds = None
+        self._collector = threading.Thread(target=self._collect, name="ocr-pool", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, worker_id):
+        task_q = self._ctx.Queue()
+        process = self._ctx.Process(target=_worker_main, args=(worker_id, self.config, task_q, self._result_q),
+                                    name=f"ocr-worker-{worker_id}", daemon=True)
+        process.start()
+        return _Worker(worker_id, process, task_q)
+
+    # --- 與 OcrEngine 相容的就緒介面 ---
+    def warmup(self): pass # 子行程建立時就開始載入
+
+    def is_ready(self):
+        with self._lock:
+            return any(w.ready for w in self._workers)
+
+    def is_failed(self):
+        with self._lock:
+            return all(w.failed for w in self._workers)
+
+    def wait_ready(self, timeout=None):
+        """
+        等待至少一個行程載入完成，成功回傳 True，逾時或全部失敗回傳 False
+        (重啟中的行程尚未就緒時會真的等待，不會立刻回傳)
+        """
+        with self._ready:
+            self._ready.wait_for(lambda: not self.is_running or any(w.ready for w in self._workers)
+                                 or all(w.failed for w in self._workers), timeout)
+            return any(w.ready for w in self._workers)
+
+    # --- 工作派送 ---
+    def submit(self, method, img, **kwargs):
+        """把 (已前處理的灰階) 影像交給子行程執行 method ('readtext' / 'recognize')，回傳 Future"""
+        future = Future()
+        if not self.is_running or self.is_failed():
+            future.set_exception(RuntimeError("OCR 工作行程池已關閉或無法啟動"))
+            return future
+        img = np.ascontiguousarray(img, dtype=np.uint8)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, img.nbytes))
+        np.ndarray(img.shape, dtype=np.uint8, buffer=shm.buf)[...] = img
+
+        with self._lock:
+            job_id = self._next_job; self._next_job += 1
+            task = (job_id, shm.name, img.shape, method, kwargs)
+            self._jobs[job_id] = {'future': future, 'shm': shm, 'task': task, 'worker': None,
+                                  'start': time.perf_counter(), 'retries': 0}
+            self.stats['submitted'] += 1
+            dispatched = self._dispatch(job_id)
+        # 檢查 is_failed() 之後行程才全部失敗
+        if not dispatched: self._finish(job_id, error="OCR 工作行程全部無法使用")
+        return future
+
+    def _dispatch(self, job_id):
+        """派給進行中工作最少的可用行程 (呼叫端需持有 _lock)；沒有可用的行程回傳 False"""
+        usable = [w for w in self._workers if not w.failed]
+        if not usable: return False
+        worker = min(usable, key=lambda w: len(w.jobs))
+        worker.jobs.add(job_id)
+        self._jobs[job_id]['worker'] = worker
+        worker.task_q.put(self._jobs[job_id]['task'])
+        return True
+
+    def _finish(self, job_id, result=None, error=None):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is None: return
+            if job['worker'] is not None: job['worker'].jobs.discard(job_id)
+            if error is None:
+                result, infer_ms = result
+                self.stats['done'] += 1
+                self.stats['total_ms'] += (time.perf_counter() - job['start']) * 1000
+                self.stats['infer_ms'] += infer_ms
+            else:
+                self.stats['errors'] += 1
+        try: job['shm'].close(); job['shm'].unlink()
+        except Exception: pass
+        if error is None: job['future'].set_result(result)
+        else: job['future'].set_exception(RuntimeError(error))
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while self.is_running:
+            if time.monotonic() - last_check >= 0.5:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, worker_id, job_id, payload = self._result_q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind == 'ready':
+                with self._ready:
+                    self._workers[worker_id].ready = True
+                    self._ready.notify_all()
+                if self.load_seconds is None: self.load_seconds = payload
+                print(f"[OCR 行程池] ✅ 工作行程 {worker_id} 模型就緒 ({payload:.1f}s)")
+            elif kind == 'failed':
+                with self._ready:
+                    self._workers[worker_id].failed = True
+                    pending = list(self._workers[worker_id].jobs)
+                    self._ready.notify_all() # 全部失敗也要叫醒等待者 (wait_ready 會回傳 False)
+                print(f"[OCR 行程池] ❌ 工作行程 {worker_id} 模型載入失敗: {payload}")
+                for job in pending: self._finish(job, error=f"OCR 模型載入失敗: {payload}")
+            elif kind == 'done':
+                self._finish(job_id, result=payload)
+            elif kind == 'error':
+                self._finish(job_id, error=payload)
+
+    def _check_workers(self):
+        """
+        子行程意外結束：重啟並重送進行中的工作 (超過重試次數則回報錯誤)
+        模型還沒載入完就結束的行程視為無法啟動，不再重啟 (避免無限重開)
+        """
+        for k, worker in enumerate(list(self._workers)):
+            if worker.failed or worker.process.is_alive(): continue
+            with self._lock:
+                orphans = sorted(worker.jobs)
+                worker.jobs.clear()
+                if worker.ready:
+                    self.stats['restarts'] += 1
+                    self._workers[k] = self._spawn(worker.id)
+                else:
+                    worker.failed = True
+                    self._ready.notify_all()
+                usable = any(not w.failed for w in self._workers)
+                retry, give_up = [], []
+                for job_id in orphans:
+                    job = self._jobs.get(job_id)
+                    if job is None: continue
+                    job['retries'] += 1
+                    (retry if usable and job['retries'] <= self.max_retries else give_up).append(job_id)
+                for job_id in retry: self._dispatch(job_id)
+            if worker.ready: print(f"[OCR 行程池] ⚠️ 工作行程 {worker.id} 已結束 (exit={worker.process.exitcode})，重新啟動")
+            else: print(f"[OCR 行程池] ❌ 工作行程 {worker.id} 啟動失敗 (exit={worker.process.exitcode})")
+            for job_id in give_up: self._finish(job_id, error="OCR 工作行程當掉")
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['in_flight'] = len(self._jobs)
+            stats['workers'] = sum(1 for w in self._workers if w.process.is_alive())
+        stats['avg_ms'] = stats['total_ms'] / stats['done'] if stats['done'] else 0.0
+        stats['avg_infer_ms'] = stats['infer_ms'] / stats['done'] if stats['done'] else 0.0
+        stats['load_seconds'] = self.load_seconds
+        return stats
+
+    def close(self):
+        self.is_running = False
+        with self._ready:
+            workers = list(self._workers)
+            pending = list(self._jobs)
+            self._ready.notify_all()
+        for worker in workers:
+            try: worker.task_q.put(None)
+            except Exception: pass
+        for worker in workers:
+            worker.process.join(timeout=2)
+            if worker.process.is_alive(): worker.process.terminate()
+        for job_id in pending: self._finish(job_id, error="OCR 工作行程池已關閉")
@@ -0,0 +1,94 @@
+# backend/plugin_registry.py
+import os
+import time
+import threading
+import importlib.util
+
+from backend.plugin_base import PluginBase
+
+PLUGIN_DIR = "extensions"
+
+class PluginRecord:
+    """一個插件檔的載入結果：類別、共用實例、載入耗時 (不是插件或匯入失敗時 cls 為 None，失敗原因在 error)"""
+    def __init__(self, filename, mtime):
+        self.filename = filename
+        self.mtime = mtime
+        self.cls = None
+        self.instance = None
+        self.import_ms = 0.0
+        self.error = None
+
+class PluginRegistry:
+    """
+    插件登錄表：每個 extensions/*.py 只匯入一次，快取插件類別與一個重複使用的實例
+    檔案修改時間改變才重新匯入 (熱更新)；執行器與編輯器共用同一份
+    """
+    def __init__(self, root=PLUGIN_DIR):
+        self.root = root
+        self.records = {} # 檔名 -> PluginRecord
+        self.lock = threading.RLock()
+
+    def _import(self, filename, mtime):
+        record = PluginRecord(filename, mtime)
+        start = time.perf_counter()
+        try:
+            name = os.path.splitext(filename)[0]
+            spec = importlib.util.spec_from_file_location(name, os.path.join(self.root, filename))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            for attr_name in dir(module):
+                attr = getattr(module, attr_name)
+                if isinstance(attr, type) and issubclass(attr, PluginBase) and attr is not PluginBase:
+                    record.cls = attr
+                    break
+        except Exception as e:
+            record.error = str(e)
+        record.import_ms = (time.perf_counter() - start) * 1000
+        if record.error: print(f"[插件] ❌ {filename} 載入失敗: {record.error}")
+        elif record.cls is not None: print(f"[插件] 🧩 載入 {filename} -> {record.cls.name} ({record.import_ms:.0f}ms)")
+        return record
+
+    def get_record(self, filename):
+        """取得插件記錄 (檔案有變動才重新匯入)，檔案不存在回傳 None"""
+        filename = os.path.basename(str(filename))
+        try: mtime = os.stat(os.path.join(self.root, filename)).st_mtime_ns
+        except OSError: return None
+        with self.lock:
+            record = self.records.get(filename)
+            if record is None or record.mtime != mtime:
+                record = self.records[filename] = self._import(filename, mtime)
+            return record
+
+    def get_class(self, filename):
+        record = self.get_record(filename)
+        return record.cls if record else None
+
+    def get_instance(self, filename):
+        """共用的插件實例 (第一次取用時建立，重新匯入後換成新類別的實例)；失敗回傳 None"""
+        record = self.get_record(filename)
+        if record is None or record.cls is None: return None
+        with self.lock:
+            if record.instance is None:
+                try: record.instance = record.cls()
+                except Exception as e:
+                    print(f"[插件] ❌ {filename} 建立實例失敗: {e}")
+                    return None
+            return record.instance
+
+    def list_plugins(self):
+        """掃描插件目錄，回傳 [(檔名, PluginRecord), ...] (只含載入成功的)"""
+        if not os.path.isdir(self.root): return []
+        plugins = []
+        for filename in sorted(os.listdir(self.root)):
+            if not filename.endswith(".py"): continue
+            record = self.get_record(filename)
+            if record is not None and record.cls is not None: plugins.append((filename, record))
+        with self.lock:
+            for filename in [f for f in self.records if not os.path.exists(os.path.join(self.root, f))]:
+                del self.records[filename] # 已刪除的插件
+        return plugins
+
+    def stats(self):
+        """各插件的載入耗時 (毫秒)"""
+        with self.lock:
+            return {f: r.import_ms for f, r in self.records.items()}
@@ -0,0 +1,69 @@
+# backend/script_cache.py
+import os
+import json
+import threading
+from collections import OrderedDict
+
+from backend.script_compiler import compile_script, ScriptCompileError
+
+class CachedScript:
+    """一個腳本檔的讀取結果：原始步驟、編譯結果 (編譯失敗時 script 為 None、error 為 ScriptCompileError)"""
+    def __init__(self, key, steps):
+        self.key = key
+        self.steps = steps
+        self.script = None
+        self.error = None
+        try: self.script = compile_script(steps)
+        except ScriptCompileError as e: self.error = e
+
+class ScriptCache:
+    """
+    腳本檔快取，以 (路徑, mtime, 檔案大小) 為鍵：排程器 / RunScript 子腳本 / 單步測試共用
+    檔案沒變就不重新讀取、解析 JSON、編譯；編輯器存檔時呼叫 invalidate() 確保下次一定重新讀取
+    ※ 取得的 steps 與編譯結果是共用的，不可修改
+    """
+    def __init__(self, max_items=32):
+        self.max_items = max_items
+        self.items = OrderedDict() # 正規化路徑 -> CachedScript
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def load(self, path):
+        """
+        回傳 (CachedScript, 是否剛重新讀取)
+        檔案不存在丟出 OSError，JSON 格式錯誤丟出 ValueError
+        """
+        name = self.normalize(path)
+        st = os.stat(name)
+        key = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.items.get(name)
+            if entry is not None and entry.key == key:
+                self.items.move_to_end(name)
+                self.hits += 1
+                return entry, False
+            self.misses += 1
+
+        with open(name, 'r', encoding='utf-8') as f: steps = json.load(f)
+        entry = CachedScript(key, steps)
+        with self.lock:
+            self.items[name] = entry
+            self.items.move_to_end(name)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+        return entry, True
+
+    def invalidate(self, path=None):
+        """移除單一腳本 (path=None 時清空全部)"""
+        with self.lock:
+            if path is None: self.items.clear()
+            else: self.items.pop(self.normalize(path), None)
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.items)}
@@ -0,0 +1,258 @@
+# backend/script_compiler.py
+import re
+
+# 含 {變數} 的步驟要等執行時代入變數後才能解析
+_VARIABLE = re.compile(r'\{[^{}|]+\}')
+
+# 每種步驟執行後的基本間隔 (秒)，(下限, 上限) 之間隨機
+STEP_GAPS = {'FindImg': (0.5, 0.8), 'FindAllImg': (0.5, 0.8), 'OCR': (0.5, 0.8), 'OCRMulti': (0.5, 0.8), 'FindColor': (0.5, 0.8),
+             'SmartAction': (0.5, 0.8), 'IfImage': (0.5, 0.8), 'Click': (0.1, 0.3), 'Key': (0.1, 0.3), 'Drag': (0.1, 0.3),
+             'Label': (0.01, 0.01), 'Goto': (0.01, 0.01), 'Loop': (0.01, 0.01), 'Comment': (0.01, 0.01)}
+DEFAULT_GAP = (0.1, 0.1)
+
+class ScriptCompileError(ValueError):
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("\n".join(self.errors))
+
+# --- 欄位解析 (執行器與編輯器共用) ---
+def parse_val_region(val_str):
+    """'主值|x,y,w,h' -> (主值, (x,y,w,h))；沒有區域時回傳 (原值, None)"""
+    if "|" in str(val_str) and len(str(val_str).split("|")) >= 2:
+        parts = val_str.split("|"); possible_region = parts[-1]
+        if "," in possible_region and len(possible_region.split(',')) == 4:
+            try: rx, ry, rw, rh = map(int, possible_region.split(',')); return "|".join(parts[:-1]), (rx, ry, rw, rh)
+            except ValueError: pass
+    return val_str, None
+
+def parse_smart_val(val_str):
+    """'a|b|c|...|x,y,w,h' -> ([a, b, c, ...] 補滿 7 欄, 區域或 None)"""
+    parts = str(val_str).split('|'); region = None
+    if "," in parts[-1] and len(parts[-1].split(',')) == 4:
+        try: region = tuple(map(int, parts[-1].split(','))); parts = parts[:-1]
+        except ValueError: pass
+    while len(parts) < 7: parts.append("")
+    return parts, region
+
+def parse_colors(val_str):
+    """'r,g,b;r,g,b' -> [(r,g,b), ...] (多色以 ; 分隔)"""
+    return [tuple(map(int, c.split(','))) for c in str(val_str).split(';') if c.strip()]
+
+def parse_ocr_fields(val_str):
+    """'名稱=x,y,w,h;名稱=x,y,w,h' -> [(名稱, (x,y,w,h)), ...]"""
+    fields = []
+    for part in str(val_str).split(';'):
+        if '=' not in part: continue
+        name, rect = part.split('=', 1)
+        fields.append((name.strip(), tuple(map(int, rect.split(',')))))
+    return fields
+
+def parse_probes(val_str, tolerance=20):
+    """'x,y,r,g,b;x,y,r,g,b' -> check_pixels 用的 [(x, y, (r,g,b), 容許值), ...]"""
+    probes = []
+    for part in str(val_str).split(';'):
+        if not part.strip(): continue
+        x, y, r, g, b = map(int, part.split(','))
+        probes.append((x, y, (r, g, b), tolerance))
+    return probes
+
+def _point(text):
+    x, y = str(text).split(',')[:2]
+    return int(x), int(y)
+
+# --- 各步驟的參數解析：val 字串 -> 參數字典，格式錯誤丟出 ValueError ---
+def _parse_label(val):
+    return {'name': val}
+
+def _parse_goto(val):
+    return {'label': parse_val_region(val)[0]}
+
+def _parse_loop(val):
+    parts = str(val).split('|')
+    return {'label': parts[0], 'count': int(parts[1]),
+            'fail_act': parts[2] if len(parts) > 2 else "Stop", 'fail_param': parts[3] if len(parts) > 3 else ""}
+
+def _parse_if_image(val):
+    parts = str(val).split('|'); chk_region = None
+    if len(parts) > 2:
+        try: chk_region = tuple(map(int, parts[1].split(',')))
+        except ValueError: pass
+    return {'path': parts[0], 'label': parts[-1], 'check_region': chk_region, 'region': parse_val_region(val)[1]}
+
+def _parse_branch(act, param):
+    """成立 / 不成立時的動作；ClickOffset 的位移先轉好"""
+    if act == 'ClickOffset': return act, _point(param)
+    return act, param
+
+def _parse_smart(val):
+    parts, region = parse_smart_val(val)
+    cond, target = parts[0], parts[1]
+    if cond not in ('FindImg', 'OCR', 'FindColor'): raise ValueError(f"未知的判斷類型 '{cond}'")
+    try: threshold = float(parts[6])
+    except ValueError: threshold = 0.8
+    succ_act, succ_param = _parse_branch(parts[2], parts[3])
+    fail_act, fail_param = _parse_branch(parts[4], parts[5])
+    args = {'cond': cond, 'target': target, 'threshold': threshold, 'region': region,
+            'succ_act': succ_act, 'succ_param': succ_param, 'fail_act': fail_act, 'fail_param': fail_param}
+    if cond == 'FindColor': args['colors'] = parse_colors(target)
+    return args
+
+def _parse_click(val):
+    return {'pos': _point(parse_val_region(val)[0])}
+
+def _parse_key(val):
+    return {'code': int(parse_val_region(val)[0])}
+
+def _parse_drag(val):
+    parts = str(val).split('|')
+    return {'start': _point(parts[0]), 'end': _point(parts[1])}
+
+def _parse_target_region(val):
+    target, region = parse_val_region(val)
+    return {'target': target, 'region': region}
+
+def _parse_ocr(val):
+    target, region = parse_val_region(val)
+    return {'target': str(target).strip(), 'region': region}
+
+def _parse_ocr_multi(val):
+    fields = parse_ocr_fields(val)
+    if not fields: raise ValueError("沒有任何欄位")
+    return {'fields': fields}
+
+WAIT_THRESHOLDS = {'FindImg': 0.8, 'FindColor': 20, 'Pixel': 20, 'OCR': 0.5}
+
+def _parse_wait_until(val):
+    parts, region = parse_smart_val(val)
+    cond, target = parts[0], parts[1]
+    if cond not in WAIT_THRESHOLDS: raise ValueError(f"未知的條件類型 '{cond}'")
+    args = {'cond': cond, 'target': target, 'region': region,
+            'timeout': float(parts[2]) if parts[2] else 30.0,
+            'threshold': float(parts[3]) if parts[3] else WAIT_THRESHOLDS[cond],
+            'fail_act': parts[4], 'fail_param': parts[5]}
+    if cond == 'Pixel' and not parse_probes(target): raise ValueError("沒有任何像素點")
+    if cond == 'FindColor': parse_colors(target)
+    return args
+
+def _parse_find_color(val):
+    target, region = parse_val_region(val)
+    return {'colors': parse_colors(target), 'region': region}
+
+def _parse_plugin(val):
+    return {'name': str(parse_val_region(val)[0])}
+
+def _parse_wait(val):
+    return {'seconds': float(parse_val_region(val)[0])}
+
+def _parse_nothing(val):
+    return {}
+
+PARSERS = {
+    'Label': _parse_label, 'Goto': _parse_goto, 'Loop': _parse_loop, 'IfImage': _parse_if_image,
+    'SmartAction': _parse_smart, 'Click': _parse_click, 'Key': _parse_key, 'Drag': _parse_drag,
+    'FindImg': _parse_target_region, 'FindAllImg': _parse_target_region, 'OCR': _parse_ocr, 'OCRMulti': _parse_ocr_multi,
+    'WaitUntil': _parse_wait_until, 'WaitWhile': _parse_wait_until, 'FindColor': _parse_find_color,
+    'Plugin': _parse_plugin, 'Wait': _parse_wait, 'LogicPlugin': _parse_nothing, 'Comment': _parse_nothing,
+}
+
+# 參數中代表標籤名稱的欄位 -> 對應的跳轉動作欄位 (None 代表一定會跳)
+# 找不到標籤只警告不擋下：舊腳本常留有到不了的跳轉，執行到時才記錄錯誤 (行為與舊版相同：Goto / Loop 停在該步，其他步驟往下走)
+_JUMPS = {
+    'Goto': [('label', None)],
+    'Loop': [('label', None), ('fail_param', 'fail_act')],
+    'IfImage': [('label', None)],
+    'SmartAction': [('succ_param', 'succ_act'), ('fail_param', 'fail_act')],
+    'WaitUntil': [('fail_param', 'fail_act')],
+    'WaitWhile': [('fail_param', 'fail_act')],
+}
+
+class Op:
+    """
+    編譯後的步驟：參數已解析 (args)，跳轉標籤已換成步驟索引 (jumps: 欄位名稱 -> 索引)
+    含 {變數} 的步驟 dynamic=True，執行時代入變數後再解析
+    """
+    __slots__ = ('index', 'type', 'raw', 'opts', 'args', 'jumps', 'gap', 'dynamic', 'disabled')
+
+    def __init__(self, index, step_type, raw, opts):
+        self.index = index
+        self.type = step_type
+        self.raw = raw
+        self.opts = opts
+        self.args = None
+        self.jumps = {}
+        self.gap = STEP_GAPS.get(step_type, DEFAULT_GAP)
+        self.dynamic = False
+        self.disabled = False
+
+    def __repr__(self):
+        return f"Op({self.index}, {self.type}, {self.args})"
+
+class CompiledScript:
+    def __init__(self, ops, labels, warnings):
+        self.ops = ops
+        self.labels = labels # 標籤名稱 -> 第一個同名 Label 的索引
+        self.warnings = warnings
+        self.uses_ocr = any(not op.disabled and _uses_ocr(op.type, op.raw, op.opts) for op in ops)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def label_index(self, name):
+        return self.labels.get(name)
+
+def _uses_ocr(step_type, val, opts):
+    """需要 OCR 模型的步驟 (點陣字不需要)"""
+    if (opts or {}).get('ocr') == 'glyph': return False
+    if step_type in ('OCR', 'OCRMulti'): return True
+    return step_type in ('SmartAction', 'WaitUntil', 'WaitWhile') and str(val).startswith('OCR|')
+
+def steps_use_ocr(steps):
+    """未編譯的步驟列表內是否有需要 OCR 模型的步驟 (編輯器開檔時用來提早在背景載入模型)"""
+    return any(isinstance(step, dict) and not step.get('disabled') and _uses_ocr(step.get('type'), step.get('val'), step.get('opts'))
+               for step in steps)
+
+def parse_args(step_type, val):
+    parser = PARSERS.get(step_type)
+    if parser is None: raise ValueError(f"未知的步驟類型 '{step_type}'")
+    try: return parser(val)
+    except (ValueError, IndexError, TypeError) as e:
+        raise ValueError(f"參數格式錯誤 '{val}': {e}") from None
+
+def compile_script(steps):
+    """
+    步驟列表 (腳本 JSON) -> CompiledScript
+    - 每個步驟的參數只解析一次；格式錯誤、未知類型的步驟收集起來一次丟出 ScriptCompileError
+    - 找不到的跳轉標籤記在 warnings
+    - 停用的步驟編譯成空步驟 (保留索引，標籤仍可跳轉)
+    """
+    if isinstance(steps, CompiledScript): return steps
+    ops, errors, warnings, labels = [], [], [], {}
+    for index, step in enumerate(steps):
+        if not isinstance(step, dict) or 'type' not in step:
+            errors.append(f"第 {index + 1} 步: 不是有效的步驟 {step!r}")
+            ops.append(Op(index, 'Comment', None, {})); ops[-1].args = {}
+            continue
+        opts = step.get('opts') if isinstance(step.get('opts'), dict) else {}
+        op = Op(index, step['type'], step.get('val'), opts)
+        ops.append(op)
+        if op.type == 'Label': labels.setdefault(op.raw, index)
+        if step.get('disabled') and op.type != 'Label':
+            op.disabled = True; op.type = 'Comment'; op.args = {}; op.gap = STEP_GAPS['Comment']
+            continue
+        if isinstance(op.raw, str) and _VARIABLE.search(op.raw):
+            if op.type not in PARSERS: errors.append(f"第 {index + 1} 步: 未知的步驟類型 '{op.type}'")
+            op.dynamic = True
+            continue
+        try: op.args = parse_args(op.type, op.raw)
+        except ValueError as e: errors.append(f"第 {index + 1} 步 ({op.type}): {e}")
+
+    for op in ops:
+        if op.args is None: continue
+        for field, act_field in _JUMPS.get(op.type, []):
+            if act_field is not None and op.args.get(act_field) != 'Goto': continue
+            name = op.args[field]
+            if name in labels: op.jumps[field] = labels[name]
+            else: warnings.append(f"第 {op.index + 1} 步 ({op.type}): 找不到標籤 '{name}'")
+
+    if errors: raise ScriptCompileError(errors)
+    return CompiledScript(ops, labels, warnings)
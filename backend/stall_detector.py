@@ -0,0 +1,109 @@
+# backend/stall_detector.py
+import os
+import json
+import time
+from contextlib import nullcontext
+import cv2
+import numpy as np
+
+WATCHDOG_CONFIG_FILE = "watchdog_config.json"
+
+# interval: 檢查間隔 (秒)
+# regions: 監看的區域，region 為 null 代表整個螢幕
+#   diff: 縮圖平均灰階差 (0~255) 低於此值
+#   cells: 且變動格子比例低於此值 (格子差超過 cell_diff 才算變動)，才視為「沒動」
+#   warn_after / stop_after: 連續沒動幾秒後警告 / 緊急停止 (null 代表不停止)
+DEFAULT_WATCHDOG_CONFIG = {
+    'interval': 1.0,
+    'regions': [
+        {'name': "全螢幕", 'region': None, 'diff': 3.0, 'cells': 0.01, 'cell_diff': 16, 'warn_after': 60, 'stop_after': 300},
+    ],
+}
+
+class WatchRegion:
+    """
+    單一監看區域：只保留縮小的灰階縮圖 (約 64 像素寬)，比對成本與畫面解析度無關
+    """
+    THUMB_WIDTH = 64
+
+    def __init__(self, name, region=None, diff=3.0, cells=0.01, cell_diff=16, warn_after=60, stop_after=300):
+        self.name = name
+        self.region = tuple(region) if region else None
+        self.diff = diff
+        self.cells = cells
+        self.cell_diff = cell_diff
+        self.warn_after = warn_after
+        self.stop_after = stop_after
+        self.thumb = None
+        self.static_since = None
+        self.warned = 0 # 已發出的警告次數 (每滿 warn_after 秒一次)
+
+    def thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        tw = min(w, self.THUMB_WIDTH)
+        th = max(1, min(h, round(h * tw / w)))
+        small = cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGRA2GRAY) if small.ndim == 3 else small
+
+    def update(self, frame, now):
+        """放入新畫面，回傳事件列表 [(等級, 訊息), ...]，等級為 'warn' / 'recover' / 'emergency'"""
+        thumb = self.thumbnail(frame)
+        prev, self.thumb = self.thumb, thumb
+        if prev is None or prev.shape != thumb.shape:
+            self.static_since = now
+            return []
+
+        delta = cv2.absdiff(prev, thumb)
+        moved = float(delta.mean()) >= self.diff or np.count_nonzero(delta > self.cell_diff) >= self.cells * delta.size
+        if moved:
+            events = [('recover', f"[看門狗] ✅ {self.name} 恢復變動")] if self.warned else []
+            self.static_since = now
+            self.warned = 0
+            return events
+
+        static = now - self.static_since
+        if self.stop_after and static >= self.stop_after:
+            self.static_since = now
+            self.warned = 0
+            return [('emergency', f"[看門狗] 🚨 緊急：{self.name} 靜止超過 {self.stop_after} 秒！強制停止！")]
+        if self.warn_after and static >= self.warn_after * (self.warned + 1):
+            self.warned += 1
+            return [('warn', f"[看門狗] ⚠️ 警告：{self.name} 已靜止 {static:.0f} 秒")]
+        return []
+
+class StallDetector:
+    """
+    卡死偵測：每次檢查只擷取一次 (所有區域的外接矩形)，各區域縮圖後比對
+    """
+    def __init__(self, vision, config=None):
+        self.vision = vision
+        self.config = dict(DEFAULT_WATCHDOG_CONFIG)
+        self.config.update(config if config is not None else self.load_config())
+        self.interval = float(self.config.get('interval', 1.0))
+        self.regions = []
+        for spec in self.config.get('regions') or DEFAULT_WATCHDOG_CONFIG['regions']:
+            try: self.regions.append(WatchRegion(**spec))
+            except TypeError as e: print(f"[看門狗] ⚠️ 區域設定錯誤，已略過: {spec} ({e})")
+
+    @staticmethod
+    def load_config():
+        if os.path.exists(WATCHDOG_CONFIG_FILE):
+            try:
+                with open(WATCHDOG_CONFIG_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"[看門狗] ⚠️ 設定檔讀取失敗: {e}")
+        return {}
+
+    def check(self, now=None):
+        now = time.monotonic() if now is None else now
+        events = []
+        # 多個區域時整批只擷取一次；有背景擷取服務時直接取它的最新畫面，不另外擷取
+        regions = [r.region for r in self.regions]
+        pin = nullcontext()
+        if len(regions) > 1 and self.vision.capture_service is None:
+            pin = self.vision.snapshot(self.vision._union_region(regions))
+        with pin:
+            for watch in self.regions:
+                events.extend(watch.update(self.vision.capture_frame(watch.region, max_age=self.interval / 2), now))
+        return events
@@ -0,0 +1,60 @@
+# backend/text_match.py
+import re
+import difflib
+from collections import Counter
+
+_SPACES = re.compile(r'\s+')
+
+def normalize_text(text):
+    return _SPACES.sub('', str(text))
+
+class _Target:
+    def __init__(self, raw):
+        self.raw = raw
+        self.text = normalize_text(raw)
+        self.counts = Counter(self.text) # 字元 -> 在目標中出現的次數 (算命中率用)
+
+class TextMatcher:
+    """
+    OCR 文字比對：目標預先正規化，一次比對所有 OCR 行 x 所有目標，回傳分數最高的一組
+    判定規則與舊版 is_text_match 相同 (去除空白後)：
+    - 目標是該行的子字串 -> 1.0
+    - 字元命中率 (目標中有出現在該行的字元比例) 或 difflib ratio 任一 >= 門檻即算符合
+    分數取兩者較大值；difflib 先用 real_quick_ratio / quick_ratio 上限剪枝，確定不可能過門檻就不算
+    """
+    def __init__(self, targets, threshold=0.5):
+        if isinstance(targets, str): targets = [targets]
+        self.threshold = threshold
+        self.targets = [t for t in (_Target(raw) for raw in targets) if t.text]
+
+    def _score(self, target, line, line_chars, sm):
+        if target.text in line: return 1.0
+        simple = sum(n for c, n in target.counts.items() if c in line_chars) / len(target.text)
+        need = max(simple, self.threshold)
+        sm.set_seq1(target.text) # seq2 (該行) 的索引在同一行的所有目標間共用
+        if sm.real_quick_ratio() >= need and sm.quick_ratio() >= need:
+            return max(simple, sm.ratio())
+        return simple
+
+    def best(self, lines, key=None):
+        """
+        lines: OCR 行 (字串，或配合 key 取出文字的物件，例如 ocr_screen 的 [box, text, conf])
+        回傳 (目標原字串, 該行物件, 分數)；沒有任何一組過門檻時回傳 None
+        同分時取較早出現的行 / 目標
+        """
+        best = None
+        for item in lines:
+            line = normalize_text(key(item) if key else item)
+            if not line: continue
+            sm = difflib.SequenceMatcher(None, '', line)
+            line_chars = set(line)
+            for target in self.targets:
+                score = self._score(target, line, line_chars, sm)
+                if score >= self.threshold and (best is None or score > best[2]):
+                    best = (target.raw, item, score)
+                    if score >= 1.0: return best
+        return best
+
+    def match(self, line):
+        """單行是否符合任一目標"""
+        return self.best([line]) is not None
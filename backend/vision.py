@@ -2,7 +2,179 @@ import cv2
 import numpy as np
 import mss
 import os
-import easyocr
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future
+from backend.capture_service import CaptureService
+from backend.ocr_engine import OcrEngine
+from backend.ocr_pool import OcrWorkerPool
+from backend.glyph_ocr import GlyphOcr
+
+class TemplateEntry:
+    """
+    一張已解碼的模板圖，附帶預先轉好的灰階與尺寸
+    """
+    def __init__(self, key, bgr):
+        self.key = key
+        self.bgr = bgr
+        self.gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        self.h, self.w = bgr.shape[:2]
+        self._scaled = {}
+
+    def scaled_gray(self, scale):
+        """縮小後的灰階模板 (金字塔比對用，依倍率快取)"""
+        img = self._scaled.get(scale)
+        if img is None:
+            img = cv2.resize(self.gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            self._scaled[scale] = img
+        return img
+
+class TemplateCache:
+    """
+    已解碼模板的 LRU 快取，以 (路徑, mtime, 檔案大小) 為鍵
+    圖片被重新截圖覆蓋後 mtime 會改變，下次讀取時自動重新解碼
+    """
+    def __init__(self, max_items=64):
+        self.max_items = max_items
+        self.items = OrderedDict() # path -> TemplateEntry
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path, loader):
+        try: st = os.stat(path)
+        except OSError: return None
+        key = (path, st.st_mtime_ns, st.st_size)
+
+        with self.lock:
+            entry = self.items.get(path)
+            if entry is not None and entry.key == key:
+                self.items.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        img = loader(path)
+        if img is None: return None
+        entry = TemplateEntry(key, img)
+        with self.lock:
+            self.items[path] = entry
+            self.items.move_to_end(path)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.items)}
+
+class OcrCache:
+    """
+    OCR 結果快取：以 (區域, 前處理參數) 分組，每組保留最近幾張畫面的縮圖雜湊與辨識結果
+    新畫面與某筆記錄的雜湊距離 <= max_distance 時直接回傳該筆結果，不跑 EasyOCR
+    """
+    def __init__(self, max_keys=32, per_key=4, max_distance=0, factor=4):
+        self.max_keys = max_keys
+        self.per_key = per_key
+        self.max_distance = max_distance # 允許不同的縮圖格數 (0 = 縮圖完全相同)
+        self.factor = factor             # 縮圖倍率 (區域寬高各除以 factor)
+        self.entries = OrderedDict()     # key -> [(雜湊, 結果), ...]
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def pixel_hash(self, gray):
+        """
+        縮圖雜湊：每 factor x factor 個像素平均成一格後量化成 32 階 (每階寬 8)
+        邊緣補齊成 factor 的倍數，格子一定對齊像素、不限制縮圖大小 (全螢幕也一樣)
+        factor=4 時每格 16 個像素，一個對比 >= 128 的文字像素改變就會讓格子平均值變化 >= 8，
+        必定跨過量化階，所以計時器跳一秒不會誤用舊結果
+        """
+        h, w = gray.shape[:2]
+        f = self.factor
+        pad_h, pad_w = -h % f, -w % f
+        if pad_h or pad_w: gray = cv2.copyMakeBorder(gray, 0, pad_h, 0, pad_w, cv2.BORDER_REPLICATE)
+        thumb = cv2.resize(gray, ((w + pad_w) // f, (h + pad_h) // f), interpolation=cv2.INTER_AREA)
+        return thumb >> 3
+
+    def lookup(self, key, digest):
+        with self.lock:
+            for old_digest, result in self.entries.get(key, []):
+                if old_digest.shape != digest.shape: continue
+                if np.count_nonzero(old_digest != digest) <= self.max_distance:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+            self.misses += 1
+        return None
+
+    def store(self, key, digest, result):
+        with self.lock:
+            records = self.entries.setdefault(key, [])
+            records.insert(0, (digest, result))
+            del records[self.per_key:]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_keys:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+class DirtyRegionTracker:
+    """
+    重複輪詢同一區域的結果快取：每個查詢 (種類, 參數, 區域) 記住上次畫面的 checksum 與結果
+    畫面 checksum 完全相同就直接回傳上次結果，不重新比對 / 找色
+    checksum 是整個區域的 CRC32 (1080p 約 3ms)，不是縮圖，所以一個像素的變化也不會誤用舊結果
+    """
+    MISS = object() # lookup 找不到時的回傳值 (結果本身可能就是 None)
+
+    def __init__(self, max_keys=128):
+        self.max_keys = max_keys
+        self.entries = OrderedDict() # key -> (checksum, 結果)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def checksum(frame):
+        return zlib.crc32(np.ascontiguousarray(frame))
+
+    def lookup(self, key, digest):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == digest:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        return self.MISS
+
+    def store(self, key, digest, result):
+        with self.lock:
+            self.entries[key] = (digest, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_keys:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
 
 class VisionEye:
     def __init__(self, monitor_index=1):
@@ -10,16 +182,95 @@ class VisionEye:
         初始化視覺模組
         """
         self.monitor_index = monitor_index
-        self.reader = None 
+        # ★ OCR 模型由 OcrEngine 管理 (背景預載 / CPU・GPU 設定 / 推論耗時)
+        self.ocr = OcrEngine()
+        self.ocr_pool = None # OCR 工作行程池 (選用)，啟用後推論改在子行程進行
+        self.glyphs = GlyphOcr() # 點陣字 OCR (遊戲固定字型的數字 / 計時器)
+
+        # ★ 常駐擷取器：每個執行緒 (執行器 / 看門狗 / 插件) 各自持有一個 mss 實例重複使用
+        # mss 的 DC 綁定建立它的執行緒，所以不能跨執行緒共用
+        self._local = threading.local()
+        self._grabber_lock = threading.Lock()
+        self._grabber_gen = 0 # 切換螢幕 / 關閉時遞增，讓各執行緒在下次擷取時重建
+
+        # ★ 模板快取：同一批 assets/*.png 不必每次都重新解碼
+        self.templates = TemplateCache(max_items=64)
+
+        # ★ 畫面快照：新鮮度內 (frame_ttl 秒) 的查詢直接裁切最近的畫面，不重新擷取
+        self.frame_ttl = 0.03
+        self._frames = deque(maxlen=4) # (rect, img, 擷取時間)
+        self._frame_lock = threading.Lock()
+        self.capture_stats = {'grabs': 0, 'reused': 0, 'service': 0}
+        self.capture_service = None # 背景擷取服務 (選用)
+
+        # ★ OCR 結果快取：區域內容沒變 (縮圖雜湊相同) 就不重跑文字辨識
+        self.ocr_cache = OcrCache(max_keys=32, per_key=4, max_distance=0)
+
+        # ★ 區域變動追蹤：find_image / find_color 輪詢同一區域時，畫面沒變就直接沿用上次結果
+        self.dirty_tracking = True
+        self.dirty = DirtyRegionTracker(max_keys=128)
+
+        # ★ OCR 前處理倍率：從區域內的文字列估計字高，放大到目標字高即可；字夠大就不放大，並受總像素上限約束
+        self.ocr_glyph_px = 14          # 找不到文字列時預估的字高 (區域比這矮時以區域高度為準)
+        self.ocr_target_px = 32         # 放大後希望的字高
+        self.ocr_max_scale = 3.0
+        self.ocr_max_pixels = 4_000_000 # 放大後影像的像素上限
+
+        # ★ 比對模式：'full' 全解析度 / 'pyramid' 先在縮小的灰階畫面粗找，再回原圖精修
+        self.match_mode = 'full'
+        self.pyramid_min_side = 12   # 縮小後模板短邊至少保留的像素，太小就退回全解析度
+        self.pyramid_candidates = 3  # 粗找保留的候選數量
+        self._pool = None # find_images 的比對執行緒池 (OpenCV 比對時會釋放 GIL)
+        self._pool_workers = 0
+
+        # ★ 區域性搜尋：記住每張模板上次命中的位置，先在附近小範圍比對，失敗才掃整個區域
+        self.locality_search = True
+        self.locality_margin = 16
+        self._last_hits = {} # (路徑, 區域) -> 上次命中的區域內左上角座標
+        self._locality_lock = threading.Lock()
+        self.locality_stats = {'tries': 0, 'hits': 0}
         
-        with mss.mss() as sct:
-            self.update_monitor_info(sct)
+        self.update_monitor_info()
+
+    def _get_grabber(self):
+        """取得目前執行緒專屬的擷取器，不存在或已過期時重建"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is not None and self._local.gen == self._grabber_gen:
+            return sct
+        if sct is not None:
+            self.release_grabber()
+
+        sct = mss.mss()
+        self._local.sct = sct
+        self._local.gen = self._grabber_gen
+        return sct
+
+    def release_grabber(self):
+        """關閉目前執行緒的擷取器 (執行緒結束前呼叫)"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None: return
+        self._local.sct = None
+        try: sct.close()
+        except Exception: pass
+
+    def close(self):
+        """
+        程式結束時呼叫：關閉目前執行緒的擷取器，並讓其他執行緒的擷取器失效
+        ※ 擷取器只能由建立它的執行緒關閉 (Windows 上是該執行緒的螢幕 DC)，
+          其他執行緒在結束前 release_grabber()，或下次擷取時發現過期自行關閉重建
+        """
+        self.stop_capture_service()
+        self.stop_ocr_pool()
+        with self._grabber_lock:
+            self._grabber_gen += 1
+        self.release_grabber()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
 
     def update_monitor_info(self, sct_instance=None):
-        should_close = False
         if sct_instance is None:
-            sct_instance = mss.mss()
-            should_close = True
+            sct_instance = self._get_grabber()
             
         if self.monitor_index < len(sct_instance.monitors):
             self.monitor_rect = sct_instance.monitors[self.monitor_index]
@@ -27,35 +278,198 @@ class VisionEye:
             print(f"[視覺] ⚠️ 螢幕編號 {self.monitor_index} 超出範圍，重設為 1")
             self.monitor_index = 1
             self.monitor_rect = sct_instance.monitors[1]
-            
-        if should_close:
-            sct_instance.close()
 
     def set_monitor(self, index):
         self.monitor_index = index
-        with mss.mss() as sct:
-            self.update_monitor_info(sct)
+        # 讓所有執行緒的擷取器失效，下次擷取時以新的螢幕配置重建
+        with self._grabber_lock:
+            self._grabber_gen += 1
+        with self._frame_lock:
+            self._frames.clear()
+        with self._locality_lock:
+            self._last_hits.clear()
+        self.ocr_cache.clear()
+        self.dirty.clear()
+        self.update_monitor_info()
+        # 背景擷取服務以新的螢幕範圍重新啟動
+        service = self.capture_service
+        if service is not None:
+            self.stop_capture_service()
+            self.start_capture_service(service.fps, service.regions, service.buffer_size)
         print(f"[視覺] 👁️ 已切換至螢幕 {index}")
 
-    def _get_reader(self):
-        if self.reader is None:
-            print("[視覺] 正在載入 EasyOCR 文字辨識模型...")
-            self.reader = easyocr.Reader(['ch_tra', 'en'], gpu=True) 
-        return self.reader
-
-    def capture_screen(self, region=None):
-        with mss.mss() as sct:
-            monitor = self.monitor_rect
-            if region:
-                x, y, w, h = region
-                monitor_region = {"top": y, "left": x, "width": w, "height": h}
-                sct_img = sct.grab(monitor_region)
-            else:
-                sct_img = sct.grab(monitor)
-                
-            img = np.array(sct_img)
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            return img
+    def start_capture_service(self, fps=10, regions=None, buffer_size=4):
+        """
+        啟動背景擷取：之後 capture_frame / capture_screen 會優先取用服務的最新畫面
+        regions: 只擷取這些區域 (x,y,w,h)；None 代表整個螢幕
+        """
+        self.stop_capture_service()
+        self.capture_service = CaptureService(self, fps=fps, regions=regions, buffer_size=buffer_size)
+        self.capture_service.start()
+        print(f"[視覺] 📸 背景擷取已啟動 ({fps} fps)")
+        return self.capture_service
+
+    def stop_capture_service(self):
+        service = self.capture_service
+        if service is None: return
+        self.capture_service = None
+        service.stop()
+        service.join(timeout=2)
+        print("[視覺] 📸 背景擷取已停止")
+
+    def _get_reader(self, timeout=None):
+        return self.ocr.get_reader(timeout)
+
+    def start_ocr_pool(self, workers=1):
+        """啟用 OCR 工作行程池：模型在子行程載入，ocr_screen_async 回傳的 Future 不佔用本行程的 GIL"""
+        self.stop_ocr_pool()
+        self.ocr_pool = OcrWorkerPool(workers=workers, config=self.ocr.config)
+        print(f"[視覺] 🔤 OCR 工作行程池已啟動 ({workers} 個行程)")
+        return self.ocr_pool
+
+    def stop_ocr_pool(self):
+        pool = self.ocr_pool
+        if pool is None: return
+        self.ocr_pool = None
+        pool.close()
+        print("[視覺] 🔤 OCR 工作行程池已停止")
+
+    def ocr_backend(self):
+        """目前負責推論的 OCR 後端 (行程池或本行程模型)，兩者都有 warmup / wait_ready / is_ready / is_failed"""
+        return self.ocr_pool or self.ocr
+
+    def _ocr_submit(self, method, img, timeout=None, **kwargs):
+        """把推論交給行程池 (有啟用時) 或本行程的模型，一律回傳 Future"""
+        pool = self.ocr_pool
+        if pool is not None: return pool.submit(method, img, **kwargs)
+        future = Future()
+        try: future.set_result(getattr(self.ocr, method)(img, timeout=timeout, **kwargs))
+        except Exception as e: future.set_exception(e)
+        return future
+
+    def _region_rect(self, region):
+        if region:
+            x, y, w, h = region
+            return {"left": x, "top": y, "width": w, "height": h}
+        m = self.monitor_rect
+        return {"left": m['left'], "top": m['top'], "width": m['width'], "height": m['height']}
+
+    @staticmethod
+    def _crop(frame_rect, img, rect):
+        """若 rect 完整落在 frame 內，回傳裁切視圖 (不複製)，否則 None"""
+        x = rect['left'] - frame_rect['left']
+        y = rect['top'] - frame_rect['top']
+        w, h = rect['width'], rect['height']
+        if x < 0 or y < 0 or x + w > frame_rect['width'] or y + h > frame_rect['height']:
+            return None
+        return img[y:y + h, x:x + w]
+
+    def _reuse_frame(self, rect, max_age):
+        # 1. 目前執行緒釘選的快照 (snapshot 區塊內) 優先
+        for frame_rect, img in reversed(getattr(self._local, 'pinned', None) or []):
+            view = self._crop(frame_rect, img, rect)
+            if view is not None: return view
+
+        if max_age <= 0: return None
+
+        # 2. 背景擷取服務的最新畫面 (同樣要在呼叫端要求的新鮮度內，避免拿到點擊之前的畫面)
+        service = self.capture_service
+        if service is not None:
+            frame = service.latest_frame(rect, max_age=max_age)
+            if frame is not None:
+                with self._frame_lock:
+                    self.capture_stats['service'] += 1
+                return frame
+
+        # 3. 其他查詢剛擷取過、仍在新鮮度內的畫面
+        now = time.monotonic()
+        with self._frame_lock:
+            for frame_rect, img, stamp in reversed(self._frames):
+                if now - stamp > max_age: continue
+                view = self._crop(frame_rect, img, rect)
+                if view is not None:
+                    self.capture_stats['reused'] += 1
+                    return view
+        return None
+
+    @staticmethod
+    def _as_bgra(sct_img):
+        """
+        把 mss 擷取結果的原始緩衝區直接包成 (h, w, 4) 陣列，不做任何複製也不寫入
+        ※ alpha 通道的值依系統而定 (Windows 多半是 0)，使用端一律忽略第 4 個通道 (轉灰階 / BGR、找色查表都不看 alpha)
+        """
+        img = np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+        img.flags.writeable = False
+        return img
+
+    def _grab(self, rect):
+        sct = self._get_grabber()
+        img = self._as_bgra(sct.grab(rect))
+        with self._frame_lock:
+            self.capture_stats['grabs'] += 1
+            self._frames.append((rect, img, time.monotonic()))
+        return img
+
+    def capture_frame(self, region=None, max_age=None):
+        """
+        擷取螢幕的 BGRA 唯讀畫面 (零複製，比對 / 找色 / OCR 內部都用這個)
+        region 為 x,y,w,h；None 代表整個螢幕
+        max_age: 可接受的畫面年齡 (秒)，預設 frame_ttl；傳 0 強制重新擷取
+        """
+        rect = self._region_rect(region)
+        if max_age is None: max_age = self.frame_ttl
+        img = self._reuse_frame(rect, max_age)
+        if img is not None: return img
+        return self._grab(rect)
+
+    def _to_bgr(self, frame):
+        """
+        BGRA -> BGR，寫進目前執行緒重複使用的緩衝區 (暖機後不再配置記憶體)
+        ※ 回傳值在同一執行緒下次呼叫時會被覆寫，只能立即使用
+        """
+        if frame.ndim != 3 or frame.shape[2] != 4: return frame
+        h, w = frame.shape[:2]
+        buf = getattr(self._local, 'bgr_buf', None)
+        if buf is None or buf.size < h * w * 3:
+            buf = np.empty(h * w * 3, dtype=np.uint8)
+            self._local.bgr_buf = buf
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=buf[:h * w * 3].reshape(h, w, 3))
+
+    def capture_screen(self, region=None, max_age=None):
+        """擷取螢幕並轉成可自由修改的 BGR 影像 (給插件等外部使用)"""
+        return cv2.cvtColor(self.capture_frame(region, max_age), cv2.COLOR_BGRA2BGR)
+
+    @contextmanager
+    def snapshot(self, region=None):
+        """
+        釘選一張畫面：區塊內同一執行緒的所有視覺查詢都從這張畫面裁切
+        用法: with vision.snapshot(): vision.find_image(...); vision.find_color(...)
+        """
+        rect = self._region_rect(region)
+        img = self._grab(rect)
+        pinned = getattr(self._local, 'pinned', None) or []
+        self._local.pinned = pinned + [(rect, img)]
+        try:
+            yield img
+        finally:
+            self._local.pinned = pinned
+
+    def region_fingerprint(self, region=None, max_age=None):
+        """
+        區域的灰階縮圖指紋 (最寬 128 像素)，用來便宜地判斷畫面有沒有變
+        先縮小 BGRA 再轉灰階，成本幾乎只剩擷取本身
+        """
+        frame = self.capture_frame(region, max_age)
+        h, w = frame.shape[:2]
+        tw = min(w, 128)
+        th = max(1, min(h, 72, round(h * tw / w)))
+        return cv2.cvtColor(cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA), cv2.COLOR_BGRA2GRAY)
+
+    @staticmethod
+    def fingerprint_changed(old, new, tolerance=2):
+        """兩個指紋是否有任何格子差超過 tolerance (容許壓縮 / 抖動雜訊)"""
+        if old is None or old.shape != new.shape: return True
+        return int(cv2.absdiff(old, new).max()) > tolerance
 
     def read_image_safe(self, path):
         try:
@@ -66,65 +480,535 @@ class VisionEye:
             print(f"[視覺] 讀取圖片失敗: {e}")
             return None
 
-    def find_image(self, template_path, confidence=0.8, region=None):
-        if not os.path.exists(template_path): return None
-        screen = self.capture_screen(region)
-        template = self.read_image_safe(template_path)
-        if template is None: return None
+    def get_template(self, template_path):
+        """從快取取得模板 (檔案不存在或解碼失敗回傳 None)"""
+        return self.templates.get(template_path, self.read_image_safe)
+
+    def get_stats(self):
+        """各視覺快取的命中統計 (供執行器日誌使用)"""
+        with self._frame_lock:
+            capture = dict(self.capture_stats)
+        with self._locality_lock:
+            locality = dict(self.locality_stats)
+        stats = {'templates': self.templates.stats(), 'capture': capture, 'locality': locality,
+                 'ocr_cache': self.ocr_cache.stats(), 'dirty': self.dirty.stats(), 'ocr': self.ocr.get_stats()}
+        pool = self.ocr_pool
+        if pool is not None: stats['ocr_pool'] = pool.get_stats()
+        service = self.capture_service
+        if service is not None: stats['service'] = service.get_stats()
+        return stats
+
+    def format_stats(self):
+        stats = self.get_stats()
+        t = stats['templates']
+        c = stats['capture']
+        l = stats['locality']
+        rate = l['hits'] / l['tries'] * 100 if l['tries'] else 0
+        text = (f"模板快取 命中 {t['hits']} / 未命中 {t['misses']} (已快取 {t['size']} 張) | "
+                f"擷取 {c['grabs']} 次 / 共用畫面 {c['reused']} 次 / 背景畫面 {c['service']} 次 | "
+                f"區域性搜尋 {l['hits']}/{l['tries']} ({rate:.0f}%) | "
+                f"OCR 快取 命中 {stats['ocr_cache']['hits']} / 未命中 {stats['ocr_cache']['misses']}")
+        d = stats['dirty']
+        if d['hits'] or d['misses']:
+            text += f" | 畫面未變沿用結果 {d['hits']}/{d['hits'] + d['misses']} ({d['hits'] / (d['hits'] + d['misses']) * 100:.0f}%)"
+        if 'service' in stats:
+            sv = stats['service']
+            age = f"{sv['age_ms']:.0f}ms" if sv['age_ms'] is not None else "-"
+            text += f" | 背景擷取 {sv['frames']} 張 / 掉幀 {sv['dropped']} / 畫面年齡 {age}"
+        o = stats['ocr']
+        if o['load_seconds'] is not None:
+            text += f" | OCR 模型 {o['device']} 載入 {o['load_seconds']:.1f}s / 推論 {o['calls']} 次 平均 {o['avg_ms']:.0f}ms"
+        if 'ocr_pool' in stats:
+            p = stats['ocr_pool']
+            text += (f" | OCR 行程池 {p['workers']} 行程 / 完成 {p['done']} / 進行中 {p['in_flight']} / "
+                     f"平均延遲 {p['avg_ms']:.0f}ms (推論 {p['avg_infer_ms']:.0f}ms) / 重啟 {p['restarts']}")
+        return text
+
+    def _match_full(self, screen, entry):
+        result = cv2.matchTemplate(self._to_bgr(screen), entry.bgr, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc
+
+    def _match_pyramid(self, screen, entry):
+        """
+        粗到細比對：縮小灰階畫面找出前幾名候選，再在候選附近用原圖 (BGR) 精修
+        精修分數與全解析度比對相同，信心度門檻的意義不變
+        """
+        short_side = min(entry.h, entry.w)
+        scales = [s for s in (0.125, 0.25, 0.5) if short_side * s >= self.pyramid_min_side]
+        if not scales:
+            return self._match_full(screen, entry)
+        scale = scales[0]
 
+        small_tpl = entry.scaled_gray(scale)
+        gray = cv2.cvtColor(screen, cv2.COLOR_BGRA2GRAY)
+        small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        th, tw = small_tpl.shape[:2]
+        if small.shape[0] < th or small.shape[1] < tw:
+            return self._match_full(screen, entry)
+
+        coarse = cv2.matchTemplate(small, small_tpl, cv2.TM_CCOEFF_NORMED)
+        margin = int(round(1 / scale)) + 2
+        sh, sw = screen.shape[:2]
+        best_val, best_loc = -1.0, (0, 0)
+        for _ in range(self.pyramid_candidates):
+            _, val, _, loc = cv2.minMaxLoc(coarse)
+            if val <= -1.0: break
+            # 壓掉這個候選附近，下一輪取下一個峰值
+            cx, cy = loc
+            coarse[max(0, cy - th // 2):cy + th // 2 + 1, max(0, cx - tw // 2):cx + tw // 2 + 1] = -1.0
+
+            x0 = max(0, int(cx / scale) - margin)
+            y0 = max(0, int(cy / scale) - margin)
+            x1 = min(sw, int(cx / scale) + entry.w + margin)
+            y1 = min(sh, int(cy / scale) + entry.h + margin)
+            if x1 - x0 < entry.w or y1 - y0 < entry.h: continue
+            val, loc = self._match_full(screen[y0:y1, x0:x1], entry)
+            if val > best_val:
+                best_val, best_loc = val, (x0 + loc[0], y0 + loc[1])
+        return best_val, best_loc
+
+    def _match_near_last_hit(self, screen, entry, hit_key, confidence):
+        """在上次命中位置附近的小視窗比對；達到門檻回傳 (分數, 位置)，否則 None"""
+        with self._locality_lock:
+            last = self._last_hits.get(hit_key)
+            if last is None: return None
+            self.locality_stats['tries'] += 1
+
+        m = self.locality_margin
+        sh, sw = screen.shape[:2]
+        x0 = max(0, last[0] - m); y0 = max(0, last[1] - m)
+        x1 = min(sw, last[0] + entry.w + m); y1 = min(sh, last[1] + entry.h + m)
+        if x1 - x0 < entry.w or y1 - y0 < entry.h: return None
+
+        val, loc = self._match_full(screen[y0:y1, x0:x1], entry)
+        if val < confidence: return None
+        with self._locality_lock:
+            self.locality_stats['hits'] += 1
+        return val, (x0 + loc[0], y0 + loc[1])
+
+    def _locate(self, screen, entry, confidence, region, mode):
+        """在已擷取的畫面上比對模板，成功回傳全域中心座標"""
+        if mode is None: mode = self.match_mode
+        hit_key = (entry.key[0], tuple(region) if region else None)
         try:
-            result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+            near = self._match_near_last_hit(screen, entry, hit_key, confidence) if self.locality_search else None
+            if near is not None:
+                max_val, max_loc = near
+            elif mode == 'pyramid':
+                max_val, max_loc = self._match_pyramid(screen, entry)
+            else:
+                max_val, max_loc = self._match_full(screen, entry)
+
+            with self._locality_lock:
+                if max_val >= confidence: self._last_hits[hit_key] = max_loc
+                else: self._last_hits.pop(hit_key, None)
 
             if max_val >= confidence:
-                h, w = template.shape[:2]
-                local_x = max_loc[0] + w // 2
-                local_y = max_loc[1] + h // 2
-                
-                if region:
-                    global_x = region[0] + local_x
-                    global_y = region[1] + local_y
-                else:
-                    global_x = self.monitor_rect['left'] + local_x
-                    global_y = self.monitor_rect['top'] + local_y
-                    
-                return (global_x, global_y)
+                return self._to_global(max_loc[0] + entry.w // 2, max_loc[1] + entry.h // 2, region)
             else:
                 return None
         except Exception as e:
             print(f"[視覺] 比對發生錯誤: {e}")
             return None
 
-    def preprocess_image(self, img):
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        scale = 3
-        enlarged = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
-        _, binary = cv2.threshold(enlarged, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        return binary
+    def _to_global(self, local_x, local_y, region):
+        """區域內座標 -> 全域螢幕座標"""
+        if region:
+            return (region[0] + local_x, region[1] + local_y)
+        return (self.monitor_rect['left'] + local_x, self.monitor_rect['top'] + local_y)
 
-    def ocr_screen(self, region=None):
+    def find_image(self, template_path, confidence=0.8, region=None, mode=None):
         """
-        ★ 修改：回傳詳細資料 (座標, 文字, 信心度)
+        mode: 'full' / 'pyramid'，None 使用 self.match_mode
         """
-        raw_img = self.capture_screen(region)
-        processed_img = self.preprocess_image(raw_img)
-        reader = self._get_reader()
-        # detail=1 會回傳 [[box], text, confidence]
-        result = reader.readtext(processed_img, detail=1, paragraph=False)
+        entry = self.get_template(template_path)
+        if entry is None: return None
+        screen = self.capture_frame(region)
+        return self._tracked(('image', entry.key, confidence, mode or self.match_mode), region, screen,
+                             lambda: self._locate(screen, entry, confidence, region, mode))
+
+    def _tracked(self, query, region, screen, compute):
+        """畫面與上次同一查詢時完全相同就回傳上次結果，否則 compute() 並記錄"""
+        if not self.dirty_tracking: return compute()
+        key = query + (tuple(region) if region else None, self.monitor_index)
+        digest = self.dirty.checksum(screen)
+        result = self.dirty.lookup(key, digest)
+        if result is DirtyRegionTracker.MISS:
+            result = compute()
+            self.dirty.store(key, digest, result)
         return result
 
-    def find_color(self, target_rgb, tolerance=20, region=None):
-        screen = self.capture_screen(region)
-        target_bgr = (target_rgb[2], target_rgb[1], target_rgb[0])
-        lower = np.array([max(0, c - tolerance) for c in target_bgr])
-        upper = np.array([min(255, c + tolerance) for c in target_bgr])
-        mask = cv2.inRange(screen, lower, upper)
-        points = cv2.findNonZero(mask)
-        if points is not None:
-            local_x = points[0][0][0]
-            local_y = points[0][0][1]
-            if region:
-                return (region[0] + local_x, region[1] + local_y)
+    @staticmethod
+    def _nms(xs, ys, w, h, overlap, max_results):
+        """
+        同尺寸框的非極大值抑制 (輸入已依分數排序)
+        每輪保留最高分的框，向量化計算它與其餘框的 IoU，剔除重疊過多的
+        """
+        keep = []
+        idx = np.arange(len(xs))
+        area = float(w * h)
+        while idx.size and len(keep) < max_results:
+            i = idx[0]
+            keep.append(i)
+            rest = idx[1:]
+            ix = np.maximum(0, w - np.abs(xs[rest] - xs[i]))
+            iy = np.maximum(0, h - np.abs(ys[rest] - ys[i]))
+            inter = ix * iy
+            iou = inter / (2 * area - inter)
+            idx = rest[iou <= overlap]
+        return keep
+
+    def find_all_images(self, template_path, confidence=0.8, region=None, sort='score', origin=None, max_results=50, overlap=0.3):
+        """
+        找出畫面中模板的所有實例 (只做一次 matchTemplate)
+        分數圖取閾值後做非極大值抑制，每個實例只留一個框
+        sort: 'score' 依分數高到低 / 'distance' 依與 origin (全域座標，預設區域中心) 的距離由近到遠
+        回傳 [(x, y, 分數), ...]，座標為全域中心點
+        """
+        entry = self.get_template(template_path)
+        if entry is None: return []
+        screen = self.capture_frame(region)
+
+        try:
+            result = cv2.matchTemplate(self._to_bgr(screen), entry.bgr, cv2.TM_CCOEFF_NORMED)
+        except Exception as e:
+            print(f"[視覺] 比對發生錯誤: {e}")
+            return []
+
+        ys, xs = np.nonzero(result >= confidence)
+        if xs.size == 0: return []
+        scores = result[ys, xs]
+
+        # 候選點過多時 (例如大片純色) 只保留分數最高的一批再做抑制
+        limit = max_results * 50
+        if scores.size > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+            xs, ys, scores = xs[top], ys[top], scores[top]
+        order = np.argsort(-scores)
+        xs, ys, scores = xs[order], ys[order], scores[order]
+
+        keep = self._nms(xs, ys, entry.w, entry.h, overlap, max_results)
+        hits = []
+        for i in keep:
+            gx, gy = self._to_global(int(xs[i]) + entry.w // 2, int(ys[i]) + entry.h // 2, region)
+            hits.append((gx, gy, float(scores[i])))
+
+        if sort == 'distance':
+            if origin is None:
+                rect = self._region_rect(region)
+                origin = (rect['left'] + rect['width'] // 2, rect['top'] + rect['height'] // 2)
+            hits.sort(key=lambda hit: (hit[0] - origin[0]) ** 2 + (hit[1] - origin[1]) ** 2)
+        return hits
+
+    def _union_region(self, regions):
+        """多個區域的外接矩形；任一個是 None (全螢幕) 就回傳 None"""
+        if not regions or any(r is None for r in regions): return None
+        x0 = min(r[0] for r in regions); y0 = min(r[1] for r in regions)
+        x1 = max(r[0] + r[2] for r in regions); y1 = max(r[1] + r[3] for r in regions)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def find_images(self, targets, confidence=0.8, region=None, mode=None, workers=0):
+        """
+        一次擷取、批次比對多張模板
+        targets: 路徑字串，或 (路徑, 信心度, 區域) tuple，或 {'path', 'confidence', 'region'} 字典
+                 未指定的信心度 / 區域使用本函式的參數
+        workers: >1 時用執行緒池平行比對
+        回傳與 targets 同順序的列表，每個元素為 (x, y) 或 None (同一張模板搭配不同區域 / 信心度也各自有結果)
+        """
+        specs = []
+        for t in targets:
+            if isinstance(t, dict):
+                specs.append((t['path'], t.get('confidence', confidence), t.get('region', region)))
+            elif isinstance(t, (tuple, list)):
+                t = list(t) + [None] * (3 - len(t))
+                specs.append((t[0], confidence if t[1] is None else t[1], region if t[2] is None else t[2]))
             else:
-                return (self.monitor_rect['left'] + local_x, self.monitor_rect['top'] + local_y)
-        return None
\ No newline at end of file
+                specs.append((t, confidence, region))
+
+        results = [None] * len(specs)
+        entries = [(k, conf, reg, self.get_template(path)) for k, (path, conf, reg) in enumerate(specs)]
+        entries = [e for e in entries if e[3] is not None]
+        if not entries: return results
+
+        # 依區域分組，整批只擷取一次 (外接矩形)，各組再從這張畫面裁切
+        groups = {}
+        for k, conf, reg, entry in entries:
+            key = tuple(reg) if reg else None
+            groups.setdefault(key, []).append((k, conf, entry))
+
+        jobs = []
+        with self.snapshot(self._union_region(list(groups.keys()))):
+            for reg, items in groups.items():
+                screen = self.capture_frame(reg)
+                for k, conf, entry in items:
+                    jobs.append((k, screen, entry, conf, reg))
+
+        if workers and workers > 1 and len(jobs) > 1:
+            if self._pool is None or self._pool_workers != workers:
+                if self._pool is not None: self._pool.shutdown(wait=False)
+                self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vision")
+                self._pool_workers = workers
+            futures = [(job[0], self._pool.submit(self._locate, job[1], job[2], job[3], job[4], mode)) for job in jobs]
+            for k, fut in futures:
+                results[k] = fut.result()
+        else:
+            for k, screen, entry, conf, reg in jobs:
+                results[k] = self._locate(screen, entry, conf, reg, mode)
+        return results
+
+    def estimate_glyph_height(self, gray):
+        """
+        估計區域內的字高：原尺寸 Otsu 二值化，取面積較少的一側當文字，
+        墨水量超過最多那列 10% 的連續列視為一行文字，回傳各行高度的中位數
+        (單行欄位就是那一行的高度)；找不到文字列時回傳 min(區域高度, ocr_glyph_px)
+        """
+        height = gray.shape[0]
+        fallback = max(1, min(height, self.ocr_glyph_px))
+        _, binary = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        ink = np.count_nonzero(binary, axis=1)
+        if ink.sum() * 2 > binary.size: ink = binary.shape[1] - ink # 亮底暗字
+        if not ink.any(): return fallback
+        rows = np.concatenate(([False], ink > max(1, ink.max() * 0.1), [False]))
+        edges = np.flatnonzero(rows[1:] != rows[:-1])
+        runs = edges[1::2] - edges[0::2]
+        runs = runs[runs >= 3] # 底線、雜點不算一行
+        if runs.size == 0: return fallback
+        return int(np.median(runs))
+
+    def ocr_scale(self, gray):
+        """依估計的字高決定 OCR 前處理的放大倍率 (無條件捨去到 0.25 的倍數，讓快取鍵穩定且不超過像素上限)；字高已達目標就不放大"""
+        height, width = gray.shape[:2]
+        glyph = self.estimate_glyph_height(gray)
+        if glyph >= self.ocr_target_px: return 1.0
+        scale = min(self.ocr_target_px / glyph, self.ocr_max_scale)
+        scale = min(scale, (self.ocr_max_pixels / max(1, height * width)) ** 0.5)
+        scale = int(scale * 4) / 4
+        return scale if scale > 1 else 1.0
+
+    def preprocess_image(self, img, scale=None):
+        """
+        灰階 -> 放大 -> Otsu 二值化
+        回傳 (影像, 倍率)，倍率用來把辨識結果的座標換算回區域座標
+        """
+        if img.ndim == 2: gray = img
+        else: gray = cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        if scale is None: scale = self.ocr_scale(gray)
+        if scale != 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary, scale
+
+    def ocr_screen(self, region=None, timeout=None, recog_only=False, allowlist=None, glyph_font=None):
+        """
+        ★ 修改：回傳詳細資料 (座標, 文字, 信心度)，座標為區域內的螢幕像素 (已換算前處理倍率)
+        timeout: 模型尚未載入完成時最多等待的秒數；使用 OCR 行程池時為等待結果的秒數 (None 代表等到好)
+        recog_only: 固定欄位 (計時器 / 座標 / 頻道) 跳過文字偵測，整個區域直接辨識成一行
+        allowlist: 限定字元 (例如 '0123456789:')，減少誤判
+        glyph_font: 指定點陣字型名稱時改用字模比對 (不經過 EasyOCR)
+        """
+        return self.ocr_screen_async(region, timeout, recog_only, allowlist, glyph_font).result(timeout)
+
+    def ocr_screen_async(self, region=None, timeout=None, recog_only=False, allowlist=None, glyph_font=None):
+        """
+        ocr_screen 的非同步版本：擷取與前處理在呼叫端完成，推論交給 OCR 後端，回傳 Future
+        (快取命中或點陣字辨識時回傳已完成的 Future)
+        """
+        if recog_only and not region: recog_only = False # 整個螢幕不會是單一欄位，退回完整偵測
+        raw_img = self.capture_frame(region)
+        gray = cv2.cvtColor(raw_img, cv2.COLOR_BGRA2GRAY)
+        if glyph_font:
+            future = Future(); future.set_result(self.glyphs.read(gray, glyph_font))
+            return future
+
+        # 同一區域、同樣前處理，畫面沒變就直接回傳上次的結果
+        scale = self.ocr_scale(gray)
+        cache_key = self._ocr_cache_key(region, scale, recog_only, allowlist)
+        digest = self.ocr_cache.pixel_hash(gray)
+        cached = self.ocr_cache.lookup(cache_key, digest)
+        if cached is not None:
+            future = Future(); future.set_result(cached)
+            return future
+
+        processed_img, scale = self.preprocess_image(gray, scale)
+        # detail=1 會回傳 [[box], text, confidence]，box 為前處理後影像的座標
+        if recog_only:
+            inner = self._ocr_submit('recognize', processed_img, timeout, detail=1, allowlist=allowlist or None)
+        else:
+            inner = self._ocr_submit('readtext', processed_img, timeout, detail=1, paragraph=False, allowlist=allowlist or None)
+
+        future = Future()
+        def finish(f):
+            try:
+                result = self._unscale_boxes(f.result(), scale)
+                self.ocr_cache.store(cache_key, digest, result)
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+        inner.add_done_callback(finish)
+        return future
+
+    @staticmethod
+    def _ocr_cache_key(region, scale, recog_only, allowlist):
+        return (tuple(region) if region else None, 'otsu', scale, 'recog' if recog_only else 'detect', allowlist)
+
+    @staticmethod
+    def _unscale_boxes(result, scale, dy=0):
+        """把前處理影像上的框 (往上平移 dy 後) 換算回區域內的螢幕像素"""
+        return [([[p[0] / scale, (p[1] - dy) / scale] for p in box], text, conf) for box, text, conf in result]
+
+    def ocr_regions(self, regions, timeout=None, recog_only=True, allowlist=None, glyph_font=None):
+        """
+        一次擷取、批次辨識多個區域 (計時器看板等固定欄位)
+        recog_only=True: 各區域前處理後疊成一張，交給辨識網路一次批次處理 (不跑文字偵測)
+        recog_only=False: 共用同一張畫面，逐區完整偵測 + 辨識
+        glyph_font: 指定點陣字型時各區域直接用字模比對
+        回傳與 regions 同順序的列表，每個元素的格式與 ocr_screen 相同
+        """
+        results = [None] * len(regions)
+        with self.snapshot(self._union_region(regions)):
+            grays = [cv2.cvtColor(self.capture_frame(r), cv2.COLOR_BGRA2GRAY) for r in regions]
+        if glyph_font: return [self.glyphs.read(gray, glyph_font) for gray in grays]
+
+        pending = [] # (索引, 快取鍵, 雜湊, 前處理影像, 倍率)
+        for k, (region, gray) in enumerate(zip(regions, grays)):
+            scale = self.ocr_scale(gray)
+            cache_key = self._ocr_cache_key(region, scale, recog_only, allowlist)
+            digest = self.ocr_cache.pixel_hash(gray)
+            cached = self.ocr_cache.lookup(cache_key, digest)
+            if cached is not None: results[k] = cached; continue
+            processed_img, scale = self.preprocess_image(gray, scale)
+            pending.append((k, cache_key, digest, processed_img, scale))
+        if not pending: return results
+
+        if recog_only:
+            batch = self._recognize_stacked([p[3] for p in pending], timeout, allowlist)
+        else:
+            futures = [self._ocr_submit('readtext', p[3], timeout, detail=1, paragraph=False, allowlist=allowlist or None) for p in pending]
+            batch = [(f.result(timeout), 0) for f in futures] # 有行程池時各區域可平行推論
+        for (k, cache_key, digest, _, scale), (result, dy) in zip(pending, batch):
+            results[k] = self._unscale_boxes(result, scale, dy)
+            self.ocr_cache.store(cache_key, digest, results[k])
+        return results
+
+    def _recognize_stacked(self, images, timeout=None, allowlist=None, gap=8):
+        """
+        把多張前處理影像上下疊成一張，每張一個文字框，一次呼叫 recognize 批次辨識
+        回傳 [(該張的結果, 該張在畫布上的 y 起點), ...]
+        """
+        width = max(img.shape[1] for img in images)
+        canvas = np.zeros((sum(img.shape[0] for img in images) + gap * (len(images) - 1), width), dtype=np.uint8)
+        boxes, spans = [], []
+        y = 0
+        for img in images:
+            h, w = img.shape[:2]
+            canvas[y:y + h, :w] = img
+            boxes.append([0, w, y, y + h]) # EasyOCR horizontal_list 格式: [x_min, x_max, y_min, y_max]
+            spans.append((y, y + h))
+            y += h + gap
+
+        raw = self._ocr_submit('recognize', canvas, timeout, horizontal_list=boxes, free_list=[],
+                               batch_size=len(images), detail=1, allowlist=allowlist or None).result(timeout)
+        # 結果順序由 EasyOCR 決定，依框的 y 座標歸回各自的區域
+        out = [([], y0) for y0, _ in spans]
+        for box, text, conf in raw:
+            top = box[0][1]
+            for k, (y0, y1) in enumerate(spans):
+                if y0 <= top < y1: out[k][0].append((box, text, conf)); break
+        return out
+
+    def check_pixels(self, probes, default_tolerance=20):
+        """
+        批次像素檢查 (血條 / 魔力 / Buff 圖示等固定點)
+        只擷取涵蓋所有點的最小矩形；有釘選快照或新鮮的共用畫面時直接讀取，不重新擷取
+        probes: [(x, y, (r,g,b)), (x, y, (r,g,b), tolerance), ...]，座標為全域螢幕座標
+        回傳 bool 陣列，第 i 個代表第 i 個點是否符合顏色
+        """
+        if not probes: return np.zeros(0, dtype=bool)
+        pts = np.array([(p[0], p[1]) for p in probes], dtype=np.int64)
+        expected = np.array([p[2] for p in probes], dtype=np.int16)[:, ::-1] # RGB -> BGR
+        tolerance = np.array([p[3] if len(p) > 3 else default_tolerance for p in probes], dtype=np.int16)
+
+        x0, y0 = pts.min(axis=0)
+        x1, y1 = pts.max(axis=0)
+        frame = self.capture_frame((int(x0), int(y0), int(x1 - x0 + 1), int(y1 - y0 + 1)))
+        pixels = frame[pts[:, 1] - y0, pts[:, 0] - x0, :3].astype(np.int16)
+        return np.all(np.abs(pixels - expected) <= tolerance[:, None], axis=1)
+
+    def check_pixel_color(self, x, y, target_rgb, tolerance=20):
+        """單點顏色檢查 (只擷取 1x1 像素)"""
+        return bool(self.check_pixels([(x, y, target_rgb, tolerance)])[0])
+
+    @staticmethod
+    def _color_lut(targets_bgr, tolerance):
+        """
+        多色查表：每個通道一張 256 格的位元表，第 j 位代表該值落在第 j 個目標色的容許範圍內
+        (最多 8 色一組)；三個通道查表後 AND 起來，非零即命中任一目標色
+        """
+        lower = np.clip(targets_bgr - tolerance, 0, 255)
+        upper = np.clip(targets_bgr + tolerance, 0, 255)
+        values = np.arange(256)[:, None]
+        bits = (1 << np.arange(len(targets_bgr))).astype(np.uint16)
+        lut = np.full((256, 1, 4), 0xFF, dtype=np.uint8) # alpha 通道不參與判斷
+        for c in range(3):
+            inside = (values >= lower[:, c]) & (values <= upper[:, c]) # (256, k)
+            lut[:, 0, c] = (inside * bits).sum(axis=1)
+        return lut
+
+    def color_mask(self, screen, target_rgbs, tolerance=20):
+        """所有目標色一次查表得到的命中遮罩 (bool，形狀同畫面)"""
+        targets = np.array(target_rgbs, dtype=np.int16).reshape(-1, 3)[:, ::-1] # RGB -> BGR
+        mask = None
+        for start in range(0, len(targets), 8):
+            mapped = cv2.LUT(screen, self._color_lut(targets[start:start + 8], tolerance))
+            hit = (mapped[..., 0] & mapped[..., 1] & mapped[..., 2]) != 0
+            mask = hit if mask is None else (mask | hit)
+        return mask
+
+    def find_color_blobs(self, target_rgbs, tolerance=20, region=None, min_area=1):
+        """
+        多色找色並回傳色塊 (連通元件)
+        target_rgbs: 單一 (r,g,b) 或多個 [(r,g,b), ...]
+        回傳 [{'center': (x, y), 'area': 像素數, 'bbox': (x, y, w, h)}, ...]，全域座標，依面積由大到小
+        """
+        return self._color_blobs(self.capture_frame(region), target_rgbs, tolerance, region, min_area)
+
+    def _color_blobs(self, screen, target_rgbs, tolerance, region, min_area):
+        mask = self.color_mask(screen, target_rgbs, tolerance)
+        if not mask.any(): return []
+
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask.view(np.uint8), connectivity=8)
+        blobs = []
+        for label in range(1, count):
+            x, y, w, h, area = stats[label]
+            if area < min_area: continue
+            cx, cy = self._to_global(int(round(centroids[label][0])), int(round(centroids[label][1])), region)
+            bx, by = self._to_global(int(x), int(y), region)
+            blobs.append({'center': (cx, cy), 'area': int(area), 'bbox': (bx, by, int(w), int(h))})
+        blobs.sort(key=lambda b: -b['area'])
+        return blobs
+
+    def find_color(self, target_rgb, tolerance=20, region=None, pick='first', near=None, min_area=1):
+        """
+        target_rgb: (r,g,b) 或多個顏色的 list
+        pick: 'first' 掃描順序第一個像素 (舊行為) / 'largest' 最大色塊中心 / 'nearest' 離 near (全域座標) 最近的色塊中心
+        """
+        screen = self.capture_frame(region)
+        colors = tuple(map(tuple, np.array(target_rgb, dtype=np.int16).reshape(-1, 3).tolist()))
+        near_key = tuple(near) if pick == 'nearest' and near is not None else None
+        return self._tracked(('color', colors, tolerance, pick, near_key, min_area), region, screen,
+                             lambda: self._find_color_in(screen, target_rgb, tolerance, region, pick, near, min_area))
+
+    def _find_color_in(self, screen, target_rgb, tolerance, region, pick, near, min_area):
+        if pick in ('largest', 'nearest'):
+            blobs = self._color_blobs(screen, target_rgb, tolerance, region, min_area)
+            if not blobs: return None
+            if pick == 'nearest' and near is not None:
+                blobs.sort(key=lambda b: (b['center'][0] - near[0]) ** 2 + (b['center'][1] - near[1]) ** 2)
+            return blobs[0]['center']
+
+        mask = self.color_mask(screen, target_rgb, tolerance)
+        first = int(np.argmax(mask)) # bool 陣列的 argmax 在第一個 True 就停止
+        if not mask.flat[first]: return None
+        local_y, local_x = divmod(first, mask.shape[1])
+        return self._to_global(local_x, local_y, region)
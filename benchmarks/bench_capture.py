@@ -0,0 +1,62 @@
+# benchmarks/bench_capture.py
+# 比較每次擷取配置的記憶體與耗時：舊流程 np.array + cvtColor vs 零複製 BGRA 包裝
+# 兩種流程都包含 mss 每次 grab 自己配置的 bytearray (一張 BGRA 畫面)，這部分省不掉
+# 用法: python -m benchmarks.bench_capture
+import time
+import threading
+import tracemalloc
+import cv2
+import numpy as np
+from mss.screenshot import ScreenShot
+
+from backend.vision import VisionEye
+
+SIZES = [("1080p", 1920, 1080), ("1440p", 2560, 1440), ("4K", 3840, 2160)]
+ROUNDS = 20
+
+def fake_screen(w, h):
+    """模擬 mss 內部重複使用的點陣圖緩衝區"""
+    return bytes(np.random.randint(0, 255, w * h * 4, dtype=np.uint8).tobytes()), {"left": 0, "top": 0, "width": w, "height": h}
+
+def fake_grab(screen):
+    """模擬 mss.grab()：每次把點陣圖複製成新的 bytearray 包進 ScreenShot (與 Windows 版 mss 相同)"""
+    data, monitor = screen
+    return ScreenShot(bytearray(data), monitor)
+
+def old_capture(screen):
+    img = np.array(fake_grab(screen))
+    return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+
+def new_capture(eye, screen):
+    frame = VisionEye._as_bgra(fake_grab(screen))
+    return eye._to_bgr(frame) # 比對前轉 BGR (寫進重複使用的緩衝區)
+
+def measure(fn, shots):
+    """回傳 (每次呼叫新配置的位元組數, 平均毫秒)"""
+    fn(shots[0]) # 暖機 (讓重複使用的緩衝區先配置好)
+    tracemalloc.start()
+    allocated = 0
+    elapsed = 0.0
+    for shot in shots:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        out = fn(shot)
+        elapsed += time.perf_counter() - start
+        allocated += tracemalloc.get_traced_memory()[1] - before
+        del out
+    tracemalloc.stop()
+    return allocated / len(shots), elapsed / len(shots) * 1000
+
+def main():
+    eye = VisionEye.__new__(VisionEye) # 只需要執行緒緩衝區，不開啟擷取器
+    eye._local = threading.local()
+    print(f"{'解析度':<8}{'舊流程 配置':>14}{'新流程 配置':>14}{'舊 ms':>10}{'新 ms':>10}")
+    for name, w, h in SIZES:
+        shots = [fake_screen(w, h) for _ in range(4)] * (ROUNDS // 4)
+        old_bytes, old_ms = measure(old_capture, shots)
+        new_bytes, new_ms = measure(lambda shot: new_capture(eye, shot), shots)
+        print(f"{name:<8}{old_bytes / 1e6:>12.1f}MB{new_bytes / 1e6:>12.1f}MB{old_ms:>10.1f}{new_ms:>10.1f}")
+
+if __name__ == "__main__":
+    main()
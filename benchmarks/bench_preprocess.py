@@ -0,0 +1,56 @@
+# benchmarks/bench_preprocess.py
+# 比較 OCR 前處理：固定 3 倍放大 vs 依估計字高自動決定倍率
+# (只量前處理與放大後的像素量；辨識耗時大致與像素量成正比)
+# 用法: python -m benchmarks.bench_preprocess
+import time
+import cv2
+import numpy as np
+
+from backend.vision import VisionEye
+
+# (名稱, 寬, 高, 實際字高)
+SIZES = [("數字欄位", 80, 18, 12), ("計時器", 160, 24, 16), ("對話框", 600, 200, 14), ("大字標題", 600, 120, 40),
+         ("半個螢幕", 1280, 720, 14), ("1080p 全螢幕", 1920, 1080, 14)]
+ROUNDS = 20
+
+def fixed_preprocess(gray):
+    enlarged = cv2.resize(gray, None, fx=3, fy=3, interpolation=cv2.INTER_CUBIC)
+    _, binary = cv2.threshold(enlarged, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+def render(w, h, glyph_px):
+    """深色底上一行行的淺色文字，字高約 glyph_px"""
+    gray = np.full((h, w), 30, dtype=np.uint8)
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    probe = np.zeros((80, 80), dtype=np.uint8)
+    cv2.putText(probe, "0", (10, 60), font, 1, 255, 1)
+    font_scale = glyph_px / np.count_nonzero(probe.any(axis=1)) # getTextSize 的高度比實際筆畫高，改用實際畫出來的高度
+    y = (h + glyph_px) // 2 if h < glyph_px * 3 else glyph_px + 2
+    while y <= h:
+        cv2.putText(gray, "HP 1234/5678 12:34", (2, y), font, font_scale, 220, max(1, glyph_px // 10))
+        y += glyph_px * 2
+    return gray
+
+def measure(fn, gray):
+    """回傳 (輸出影像, 平均毫秒)"""
+    out = fn(gray) # 暖機
+    start = time.perf_counter()
+    for _ in range(ROUNDS): out = fn(gray)
+    return out, (time.perf_counter() - start) / ROUNDS * 1000
+
+def main():
+    eye = VisionEye.__new__(VisionEye) # 只需要倍率參數，不開啟擷取器
+    eye.ocr_glyph_px = 14
+    eye.ocr_target_px = 32
+    eye.ocr_max_scale = 3.0
+    eye.ocr_max_pixels = 4_000_000
+    print(f"{'區域':<12}{'大小':>12}{'字高':>6}{'估計':>6}{'倍率':>6}{'固定 ms':>10}{'自動 ms':>10}{'固定 MP':>10}{'自動 MP':>10}")
+    for name, w, h, glyph_px in SIZES:
+        gray = render(w, h, glyph_px)
+        fixed_out, fixed_ms = measure(fixed_preprocess, gray)
+        (auto_out, scale), auto_ms = measure(eye.preprocess_image, gray)
+        print(f"{name:<12}{f'{w}x{h}':>12}{glyph_px:>6}{eye.estimate_glyph_height(gray):>6}{scale:>6.2f}{fixed_ms:>10.1f}{auto_ms:>10.1f}"
+              f"{fixed_out.size / 1e6:>10.2f}{auto_out.size / 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -97,7 +97,7 @@ class SmartActionDialog(QDialog):
         
         target_layout = QHBoxLayout()
         self.input_target = QLineEdit()
-        self.input_target.setPlaceholderText("圖片 / 關鍵字 / RGB")
+        self.input_target.setPlaceholderText("圖片 (多張以 ; 分隔) / 關鍵字 / RGB")
         
         self.combo_vars = QComboBox()
         self.combo_vars.addItem("➕ 插入變數...")
@@ -274,9 +274,9 @@ class SmartActionDialog(QDialog):
             if f: inp.setText(os.path.relpath(f, os.getcwd()))
     
     def browse_image(self):
-        f, _ = QFileDialog.getOpenFileName(self, "選圖", "assets", "Images (*.png)")
-        if f:
-            self.input_target.setText(os.path.relpath(f, os.getcwd()))
+        files, _ = QFileDialog.getOpenFileNames(self, "選圖 (可多選)", "assets", "Images (*.png)")
+        if files:
+            self.input_target.setText(";".join(os.path.relpath(f, os.getcwd()) for f in files))
 
     def start_color_picker(self):
         c = QColorDialog.getColor()
@@ -20,7 +20,9 @@ from PySide6.QtGui import QCursor, QAction
 # 後端與工具引用
 from backend.hardware import HardwareController
 from backend.vision import VisionEye
-from backend.plugin_base import PluginBase
+from backend.script_cache import ScriptCache
+from backend.script_compiler import steps_use_ocr
+from backend.plugin_registry import PluginRegistry
 from frontend.snipping_tool import SnippingWidget
 from frontend.recorder import ActionRecorder
 from frontend.overlay import OverlayWidget
@@ -49,6 +51,11 @@ class MainWindow(QMainWindow):
 
         self.hw = HardwareController(auto_connect=False)
         self.vision = VisionEye(monitor_index=1) 
+        # OCR 模型：設定了工作行程就放到子行程載入，否則在背景執行緒預載，不卡住介面
+        if self.vision.ocr.config.get('workers', 0) > 0: self.vision.start_ocr_pool(self.vision.ocr.config['workers'])
+        elif self.vision.ocr.config.get('preload'): self.vision.ocr.warmup()
+        self.script_cache = ScriptCache() # 排程器 / RunScript / 單步測試共用，存檔時失效
+        self.plugin_registry = PluginRegistry() # 插件只匯入一次，檔案有變動才重新載入
         self.watchdog = None 
         self.ext_service = None 
         self.stop_listener = None 
@@ -60,6 +67,8 @@ class MainWindow(QMainWindow):
         self.picker = None 
         self.pending_region_action = None 
         self.pending_val = None
+        self.pending_ocr_fields = [] # 多區讀字：已框選的 '名稱=x,y,w,h'
+        self.pending_glyph_font = "default"
         self.task_buffer = [] 
         self.pending_drag_start = None
         
@@ -146,6 +155,7 @@ class MainWindow(QMainWindow):
         panel_layout.addWidget(self.btn_load_service)
 
         self.chk_watchdog = QCheckBox("🐕 啟用安全監控"); self.chk_watchdog.setChecked(True); panel_layout.addWidget(self.chk_watchdog)
+        self.chk_capture_service = QCheckBox("📸 背景擷取 (降低視覺步驟延遲)"); self.chk_capture_service.setChecked(False); panel_layout.addWidget(self.chk_capture_service)
         self.chk_overlay = QCheckBox("👁️ 顯示視覺導引"); self.chk_overlay.setChecked(True); self.chk_overlay.stateChanged.connect(lambda: self.overlay.setVisible(self.chk_overlay.isChecked())); panel_layout.addWidget(self.chk_overlay)
 
         self.btn_run_all = QPushButton("▶ 開始掛機"); self.btn_run_all.setObjectName("RunBtn"); self.btn_run_all.clicked.connect(self.run_all_tasks)
@@ -226,7 +236,7 @@ class MainWindow(QMainWindow):
                 self.task_buffer = []
                 self.log_text_main.append("[系統] 已手動清除暫存任務。")
 
-        self.runner = ScriptRunner(task_objects, self.hw, self.vision)
+        self.runner = ScriptRunner(task_objects, self.hw, self.vision, self.script_cache, self.plugin_registry)
         self.runner.log_signal.connect(self.log_text_main.append)
         self.runner.draw_rect_signal.connect(self.overlay.draw_search_area)
         self.runner.draw_target_signal.connect(self.overlay.draw_target)
@@ -243,6 +253,9 @@ class MainWindow(QMainWindow):
             self.task_buffer = [] 
 
         self.start_emergency_listener()
+        if self.chk_capture_service.isChecked():
+            self.vision.start_capture_service(fps=10)
+            self.log_text_main.append("[系統] 📸 背景擷取已啟動 (10 fps)")
         self.runner.start()
         
         if self.chk_watchdog.isChecked():
@@ -316,6 +329,7 @@ class MainWindow(QMainWindow):
             self.runner = None 
             
         if self.watchdog: self.watchdog.stop(); self.watchdog.wait(); self.log_text_main.append("[看門狗] 監控已結束")
+        self.vision.stop_capture_service()
         self.stop_emergency_listener() 
         self.btn_run_all.setEnabled(True)
         self.btn_stop_all.setEnabled(False)
@@ -323,6 +337,7 @@ class MainWindow(QMainWindow):
     def on_all_finished(self):
         self.log_text_main.append(">>> 結束"); self.btn_run_all.setEnabled(True); self.btn_stop_all.setEnabled(False)
         if self.watchdog: self.watchdog.stop()
+        self.vision.stop_capture_service()
         self.stop_emergency_listener() 
         self.runner = None
 
@@ -351,7 +366,8 @@ class MainWindow(QMainWindow):
         row = self.task_list_widget.currentRow()
         if row >= 0 and QMessageBox.question(self, "刪除", "確定刪除？", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
             try:
-                os.remove(os.path.join("scripts", self.task_list_widget.item(row).data(Qt.UserRole)))
+                path = os.path.join("scripts", self.task_list_widget.item(row).data(Qt.UserRole))
+                os.remove(path); self.script_cache.invalidate(path)
                 self.refresh_tasks()
             except: pass
             
@@ -396,6 +412,14 @@ class MainWindow(QMainWindow):
         else: self.btn_connect_hw.setText("❌ 失敗"); self.btn_connect_hw.setStyleSheet("background-color: #dc3545;")
         
     def on_monitor_changed(self, index): self.vision.set_monitor(self.combo_monitors.currentData())
+
+    def closeEvent(self, event):
+        # 先停下執行器與看門狗 (它們結束前會自行關閉自己的擷取器)，再關閉視覺模組
+        if self.runner: self.runner.stop(); self.runner.wait(5000)
+        if self.watchdog: self.watchdog.stop(); self.watchdog.wait(5000)
+        self.stop_emergency_listener()
+        self.vision.close()
+        super().closeEvent(event)
     
     # ================= 編輯器區 (Editor) =================
     def init_editor(self):
@@ -406,11 +430,13 @@ class MainWindow(QMainWindow):
         self.btn_rec = QPushButton("⏺ 錄製"); self.btn_rec.setObjectName("RecBtn"); self.btn_rec.setCheckable(True); self.btn_rec.clicked.connect(self.toggle_record); self.left_layout.addWidget(self.btn_rec)
         self.btn_insert = QPushButton("📂 插入"); self.btn_insert.setObjectName("InsertBtn"); self.btn_insert.clicked.connect(self.insert_saved_script); self.left_layout.addWidget(self.btn_insert)
         self.btn_open = QPushButton("📂 開啟"); self.btn_open.setObjectName("OpenBtn"); self.btn_open.clicked.connect(self.open_saved_script); self.left_layout.addWidget(self.btn_open)
+        self.btn_glyph = QPushButton("🔠 收集點陣字模"); self.btn_glyph.clicked.connect(self.start_glyph_capture); self.left_layout.addWidget(self.btn_glyph)
         self.left_layout.addSpacing(10)
         
-        self.add_drag_btn("🖱️ 新增點擊 (F8)", 'Click'); self.add_drag_btn("✂️ 截圖新增", 'Snip'); self.add_drag_btn("🖼️ 找圖點擊", 'FindImg')
+        self.add_drag_btn("🖱️ 新增點擊 (F8)", 'Click'); self.add_drag_btn("✂️ 截圖新增", 'Snip'); self.add_drag_btn("🖼️ 找圖點擊", 'FindImg'); self.add_drag_btn("🖼️ 找圖全部點擊", 'FindAllImg')
         self.add_drag_btn("↔️ 新增拖曳", 'Drag')
-        self.add_drag_btn("🔤 OCR 讀字", 'OCR'); self.add_drag_btn("🎨 找色點擊 (F8)", 'FindColor'); self.add_drag_btn("⏳ 新增等待", 'Wait'); self.add_drag_btn("⌨️ 新增按鍵", 'Key')
+        self.add_drag_btn("🔤 OCR 讀字", 'OCR'); self.add_drag_btn("🔢 多區讀字", 'OCRMulti'); self.add_drag_btn("🎨 找色點擊 (F8)", 'FindColor'); self.add_drag_btn("⏳ 新增等待", 'Wait'); self.add_drag_btn("⌨️ 新增按鍵", 'Key')
+        self.add_drag_btn("👀 等待出現/消失", 'WaitUntil')
         self.add_drag_btn("🔁 循環限制", 'Loop')
         self.add_drag_btn("🏷️ 設定標籤", 'Label'); self.add_drag_btn("⤴️ 跳轉", 'Goto')
         self.add_drag_btn("📝 新增備註", 'Comment')
@@ -465,6 +491,39 @@ class MainWindow(QMainWindow):
         action_toggle = QAction("✅ 啟用" if is_disabled else "🚫 禁用 (Skip)", self)
         action_toggle.triggered.connect(lambda: self.toggle_step_enable(row))
         menu.addAction(action_toggle)
+
+        if self.step_uses_image_match(curr_data):
+            is_pyramid = curr_data.get('opts', {}).get('match') == 'pyramid'
+            action_pyramid = QAction("🔺 金字塔比對 (大螢幕加速)", self)
+            action_pyramid.setCheckable(True)
+            action_pyramid.setChecked(is_pyramid)
+            action_pyramid.triggered.connect(lambda: self.toggle_step_pyramid(row))
+            menu.addAction(action_pyramid)
+
+        if self.step_uses_color(curr_data):
+            pick_menu = menu.addMenu("🎨 找色點擊位置")
+            curr_pick = curr_data.get('opts', {}).get('pick', 'first')
+            for pick, label in [('first', "第一個像素 (預設)"), ('largest', "最大色塊中心"), ('nearest', "離游標最近的色塊")]:
+                action_pick = QAction(label, self)
+                action_pick.setCheckable(True)
+                action_pick.setChecked(pick == curr_pick)
+                action_pick.triggered.connect(lambda checked=False, p=pick: self.set_step_opt(row, 'pick', None if p == 'first' else p))
+                pick_menu.addAction(action_pick)
+
+        if self.step_uses_ocr(curr_data):
+            if curr_data['type'] != 'OCRMulti': # 多區讀字預設就是僅辨識
+                is_recog = curr_data.get('opts', {}).get('ocr') == 'recog'
+                action_recog = QAction("🔢 固定欄位僅辨識 (需指定範圍)", self)
+                action_recog.setCheckable(True)
+                action_recog.setChecked(is_recog)
+                action_recog.triggered.connect(lambda: self.toggle_step_recog(row))
+                menu.addAction(action_recog)
+            is_glyph = curr_data.get('opts', {}).get('ocr') == 'glyph'
+            action_glyph = QAction("🔠 點陣字辨識 (字模比對)", self)
+            action_glyph.setCheckable(True)
+            action_glyph.setChecked(is_glyph)
+            action_glyph.triggered.connect(lambda: self.toggle_step_glyph(row))
+            menu.addAction(action_glyph)
         
         menu.addSeparator()
 
@@ -489,7 +548,7 @@ class MainWindow(QMainWindow):
             print(f">>> 正在測試第 {row+1} 行: {step['type']}...")
             self.overlay.draw_search_area(0, 0, 100, 20) 
             
-            temp_runner = ScriptRunner([{'path': 'temp'}], self.hw, self.vision)
+            temp_runner = ScriptRunner([{'path': 'temp'}], self.hw, self.vision, self.script_cache, self.plugin_registry)
             temp_runner.is_running = True
             temp_runner.execute_steps([step], bridge)
             
@@ -511,6 +570,90 @@ class MainWindow(QMainWindow):
             item.setForeground(Qt.gray) 
             item.setText(f"[已停用] {item.text()}")
 
+    def step_uses_image_match(self, step):
+        if step['type'] in ('FindImg', 'IfImage'): return True
+        return step['type'] in ('SmartAction', 'WaitUntil', 'WaitWhile') and str(step['val']).startswith('FindImg')
+
+    def step_uses_color(self, step):
+        if step['type'] == 'FindColor': return True
+        return step['type'] == 'SmartAction' and str(step['val']).startswith('FindColor')
+
+    def step_uses_ocr(self, step):
+        if step['type'] in ('OCR', 'OCRMulti'): return True
+        return step['type'] in ('SmartAction', 'WaitUntil', 'WaitWhile') and str(step['val']).startswith('OCR')
+
+    def set_step_opt(self, row, key, value):
+        # 每次產生新的 opts 字典，避免複製出來的步驟共用同一份設定
+        curr = self.script_data[row]
+        opts = dict(curr.get('opts') or {})
+        if value is None: opts.pop(key, None)
+        else: opts[key] = value
+        if opts: curr['opts'] = opts
+        else: curr.pop('opts', None)
+
+    def toggle_step_pyramid(self, row):
+        item = self.list_widget.item(row)
+        curr = self.script_data[row]
+        if curr.get('opts', {}).get('match') == 'pyramid':
+            self.set_step_opt(row, 'match', None)
+            item.setText(item.text().replace("[金字塔] ", ""))
+        else:
+            self.set_step_opt(row, 'match', 'pyramid')
+            item.setText(f"[金字塔] {item.text()}")
+
+    def toggle_step_recog(self, row):
+        item = self.list_widget.item(row)
+        curr = self.script_data[row]
+        if curr.get('opts', {}).get('ocr') == 'recog':
+            self.set_step_opt(row, 'ocr', None)
+            self.set_step_opt(row, 'allow', None)
+            item.setText(item.text().replace("[僅辨識] ", ""))
+        else:
+            allow, ok = QInputDialog.getText(self, "固定欄位辨識", "限定字元 (留空 = 不限制):", text="0123456789:")
+            if not ok: return
+            self.set_step_opt(row, 'ocr', 'recog')
+            self.set_step_opt(row, 'allow', allow or None)
+            self.set_step_opt(row, 'font', None)
+            item.setText(f"[僅辨識] {item.text().replace('[點陣字] ', '')}")
+
+    def glyph_fonts(self):
+        root = self.vision.glyphs.root
+        fonts = sorted(d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))) if os.path.isdir(root) else []
+        return fonts or ["default"]
+
+    def toggle_step_glyph(self, row):
+        item = self.list_widget.item(row)
+        curr = self.script_data[row]
+        if curr.get('opts', {}).get('ocr') == 'glyph':
+            self.set_step_opt(row, 'ocr', None)
+            self.set_step_opt(row, 'font', None)
+            item.setText(item.text().replace("[點陣字] ", ""))
+        else:
+            font, ok = QInputDialog.getItem(self, "點陣字辨識", "字型:", self.glyph_fonts(), 0, True)
+            if not ok or not font: return
+            self.set_step_opt(row, 'ocr', 'glyph')
+            self.set_step_opt(row, 'font', font)
+            self.set_step_opt(row, 'allow', None)
+            item.setText(f"[點陣字] {item.text().replace('[僅辨識] ', '')}")
+
+    def start_glyph_capture(self):
+        font, ok = QInputDialog.getItem(self, "收集點陣字模", "字型名稱 (可輸入新名稱):", self.glyph_fonts(), 0, True)
+        if not ok or not font: return
+        self.pending_glyph_font = font
+        self.start_snipping(mode='glyph')
+
+    def learn_glyphs(self, result):
+        # result: '選取工具裁切的暫存圖檔|文字'
+        path, text = result.split('|', 1)
+        try:
+            count = self.vision.glyphs.learn_sample(path, text, self.pending_glyph_font)
+            QMessageBox.information(self, "點陣字模", f"已加入 {count} 個字模到字型 '{self.pending_glyph_font}'")
+        except ValueError as e:
+            QMessageBox.warning(self, "點陣字模", f"切字數量不符，請框得更精準或調整文字: {e}")
+        finally:
+            try: os.remove(path)
+            except OSError: pass
+
     def duplicate_step(self):
         row = self.list_widget.currentRow()
         if row < 0: return
@@ -554,23 +697,10 @@ class MainWindow(QMainWindow):
     def save_current_script(self):
         name, ok = QInputDialog.getText(self, "儲存", "名稱:")
         if ok and name:
-            with open(f"scripts/{name}.json", 'w', encoding='utf-8') as f: json.dump(self.script_data, f, indent=4); self.refresh_tasks()
+            with open(f"scripts/{name}.json", 'w', encoding='utf-8') as f: json.dump(self.script_data, f, indent=4)
+            self.script_cache.invalidate(f"scripts/{name}.json"); self.refresh_tasks()
             
-    def _load_plugin_instance(self, filename):
-        try:
-            name = os.path.splitext(os.path.basename(filename))[0]
-            path = os.path.join("extensions", filename)
-            if not os.path.exists(path): return None
-            
-            spec = importlib.util.spec_from_file_location(name, path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if isinstance(attr, type) and issubclass(attr, PluginBase) and attr is not PluginBase:
-                    return attr()
-        except: pass
-        return None
+    def _load_plugin_instance(self, filename): return self.plugin_registry.get_instance(filename)
 
     def edit_step(self, item):
         row = self.list_widget.row(item)
@@ -617,7 +747,7 @@ class MainWindow(QMainWindow):
         if filename:
             try:
                 with open(filename, 'r', encoding='utf-8') as f: steps = json.load(f)
-                for step in steps: self.add_step_directly(step['type'], step['val'], step['text'])
+                for step in steps: self.add_step_directly(step['type'], step['val'], step['text'], step.get('opts'))
             except Exception as e: QMessageBox.critical(self, "錯誤", f"{e}")
             
     def open_saved_script(self):
@@ -628,7 +758,8 @@ class MainWindow(QMainWindow):
                 with open(filename, 'r', encoding='utf-8') as f: steps = json.load(f)
                 for step in steps: 
                     text = step.get('text', f"{step['type']} {step['val']}")
-                    self.add_step_directly(step['type'], step['val'], text)
+                    self.add_step_directly(step['type'], step['val'], text, step.get('opts'))
+                if steps_use_ocr(steps): self.vision.ocr_backend().warmup()
             except Exception as e: QMessageBox.critical(self, "錯誤", f"{e}")
             
     def toggle_record(self):
@@ -640,24 +771,18 @@ class MainWindow(QMainWindow):
         if steps:
             fname, _ = QFileDialog.getSaveFileName(self, "存檔", "scripts/rec.json", "JSON (*.json)")
             if fname:
-                with open(fname, 'w', encoding='utf-8') as f: json.dump(steps, f, indent=4); self.refresh_tasks()
+                with open(fname, 'w', encoding='utf-8') as f: json.dump(steps, f, indent=4)
+                self.script_cache.invalidate(fname); self.refresh_tasks()
                 
     def add_logic_from_list(self, item): self.add_step_handler(item.data(Qt.UserRole))
     
     def refresh_plugin_list(self):
         self.plugin_list_widget.clear()
-        if not os.path.exists("extensions"): return
-        for f in os.listdir("extensions"):
-            if f.endswith(".py"):
-                try:
-                    spec = importlib.util.spec_from_file_location("module.name", os.path.join("extensions", f)); module = importlib.util.module_from_spec(spec); spec.loader.exec_module(module)
-                    for attr_name in dir(module):
-                        attr = getattr(module, attr_name)
-                        if isinstance(attr, type) and issubclass(attr, PluginBase) and attr is not PluginBase: 
-                            item = QListWidgetItem(f"🧩 {attr.name}")
-                            item.setData(Qt.UserRole, f) 
-                            self.plugin_list_widget.addItem(item)
-                except: pass
+        for f, record in self.plugin_registry.list_plugins():
+            item = QListWidgetItem(f"🧩 {record.cls.name}")
+            item.setData(Qt.UserRole, f)
+            item.setToolTip(f"{f} (載入 {record.import_ms:.0f}ms)")
+            self.plugin_list_widget.addItem(item)
                 
     def add_plugin_from_list(self, item): self.add_step_handler('Plugin', item.data(Qt.UserRole))
     
@@ -674,15 +799,66 @@ class MainWindow(QMainWindow):
         self.showNormal(); self.activateWindow()
         if not result: return
         if self.snipper.mode == 'save': self.add_step_directly('FindImg', result, f"🖼️ 找圖 {result}")
+        elif self.snipper.mode == 'glyph': self.learn_glyphs(result)
         elif self.snipper.mode == 'region':
+            if self.pending_region_action == 'OCRMulti' and self.pending_val:
+                self.pending_ocr_fields.append(f"{self.pending_val}={result}"); self.pending_region_action = None
+                if QMessageBox.question(self, "多區讀字", "繼續新增欄位？", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes: self._ask_ocr_field()
+                else: self._finish_ocr_fields()
+                return
             if self.pending_region_action and self.pending_val:
                 final_val = f"{self.pending_val}|{result}"
                 if self.pending_region_action == 'SmartAction': self.add_step_directly('SmartAction', final_val, f"🧠 智慧動作 (含區域)")
                 else: self.add_step_directly(self.pending_region_action, final_val, f"{self.pending_region_action} (區域: {result})")
             self.pending_region_action = None
             
-    def add_step_directly(self, action_type, val, text_display):
+    def _ask_ocr_field(self):
+        name, ok = QInputDialog.getText(self, "多區讀字", f"第 {len(self.pending_ocr_fields) + 1} 個欄位的變數名稱:")
+        if ok and name: self.pending_region_action = 'OCRMulti'; self.pending_val = name; self.start_snipping(mode='region')
+        else: self._finish_ocr_fields()
+
+    def _finish_ocr_fields(self):
+        fields = self.pending_ocr_fields; self.pending_ocr_fields = []
+        if not fields: return
+        allow, ok = QInputDialog.getText(self, "多區讀字", "限定字元 (留空 = 不限制):", text="0123456789:")
+        opts = {'allow': allow} if ok and allow else None
+        self.add_step_directly('OCRMulti', ";".join(fields), f"🔢 多區讀字 {', '.join(f.split('=')[0] for f in fields)}", opts)
+
+    def _ask_wait_condition(self):
+        """WaitUntil / WaitWhile 的對話框，回傳 (步驟類型, 'cond|target|逾時|門檻|逾時動作|參數', 顯示文字) 或 None"""
+        modes = ["等到出現 (WaitUntil)", "等到消失 (WaitWhile)"]
+        mode, ok = QInputDialog.getItem(self, "等待條件", "模式:", modes, 0, False)
+        if not ok: return None
+        action_type = 'WaitUntil' if mode == modes[0] else 'WaitWhile'
+        conds = {"圖片": 'FindImg', "顏色": 'FindColor', "像素點 (x,y,r,g,b)": 'Pixel', "文字 (OCR)": 'OCR'}
+        name, ok = QInputDialog.getItem(self, "等待條件", "條件:", list(conds), 0, False)
+        if not ok: return None
+        cond = conds[name]
+        if cond == 'FindImg':
+            img, _ = QFileDialog.getOpenFileName(self, "選圖", "assets", "Images (*.png)")
+            if not img: return None
+            target = os.path.relpath(img)
+        elif cond == 'FindColor':
+            color = QColorDialog.getColor()
+            if not color.isValid(): return None
+            target = f"{color.red()},{color.green()},{color.blue()}"
+        else:
+            hint = "像素點 (多點用 ; 分隔，全部符合才成立):" if cond == 'Pixel' else "關鍵字 (多個用 ; 分隔):"
+            target, ok = QInputDialog.getText(self, "等待條件", hint)
+            if not ok or not target: return None
+        timeout, ok = QInputDialog.getDouble(self, "等待條件", "最多等待秒數:", value=30.0, minValue=0.1, maxValue=86400, decimals=1)
+        if not ok: return None
+        label, ok = QInputDialog.getText(self, "等待條件", "逾時跳至標籤 (留空 = 繼續往下，輸入 Stop = 停止腳本):")
+        fail_act, fail_param = "", ""
+        if ok and label.strip().lower() == 'stop': fail_act = 'Stop'
+        elif ok and label.strip(): fail_act, fail_param = 'Goto', label.strip()
+        val = f"{cond}|{target}|{timeout:g}||{fail_act}|{fail_param}"
+        text_display = f"👀 {'等到出現' if action_type == 'WaitUntil' else '等到消失'} {name.split(' ')[0]} '{target}' (≤{timeout:g}s)"
+        return action_type, val, text_display
+
+    def add_step_directly(self, action_type, val, text_display, opts=None):
         curr_row = self.list_widget.currentRow(); data = {'type': action_type, 'val': val, 'text': text_display}
+        if opts: data['opts'] = dict(opts)
         if curr_row >= 0: self.script_data.insert(curr_row + 1, data); self.list_widget.insertItem(curr_row + 1, text_display); self.list_widget.setCurrentRow(curr_row + 1)
         else: self.script_data.append(data); self.list_widget.addItem(text_display); self.list_widget.scrollToBottom()
         
@@ -712,16 +888,23 @@ class MainWindow(QMainWindow):
                 count, ok2 = QInputDialog.getInt(self, "循環次數", "最大執行次數:", value=5, minValue=1)
                 if ok2: val = f"{label}|{count}"; text_display = f"🔁 循環至 '{label}' (限 {count} 次)"
         elif action_type == 'Comment': val, ok = QInputDialog.getText(self, "備註", "內容:"); 
-        elif action_type == 'FindImg':
+        elif action_type in ('FindImg', 'FindAllImg'):
              img, _ = QFileDialog.getOpenFileName(self, "選圖", "assets", "Images (*.png)"); 
              if img: val = os.path.relpath(img); reply = QMessageBox.question(self, "區域", "指定範圍？", QMessageBox.Yes | QMessageBox.No)
-             if reply == QMessageBox.Yes: self.pending_region_action = 'FindImg'; self.pending_val = val; self.start_snipping(mode='region'); return
-             text_display = f"🖼️ 找圖 {val}"
+             if reply == QMessageBox.Yes: self.pending_region_action = action_type; self.pending_val = val; self.start_snipping(mode='region'); return
+             text_display = f"🖼️ 找圖 {val}" if action_type == 'FindImg' else f"🖼️ 全部點擊 {val}"
         elif action_type == 'OCR':
              val, ok = QInputDialog.getText(self, "讀字", "關鍵字:"); 
              if ok: reply = QMessageBox.question(self, "區域", "指定範圍？", QMessageBox.Yes | QMessageBox.No)
              if reply == QMessageBox.Yes: self.pending_region_action = 'OCR'; self.pending_val = val; self.start_snipping(mode='region'); return
              text_display = f"🔤 OCR '{val}'"
+        elif action_type == 'OCRMulti': self.pending_ocr_fields = []; self._ask_ocr_field(); return
+        elif action_type in ('WaitUntil', 'WaitWhile'):
+            spec = self._ask_wait_condition()
+            if not spec: return
+            action_type, val, text_display = spec
+            if not val.startswith('Pixel') and QMessageBox.question(self, "區域", "指定範圍？", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+                self.pending_region_action = action_type; self.pending_val = val; self.start_snipping(mode='region'); return
         elif action_type == 'FindColor':
              color = QColorDialog.getColor()
              if color.isValid(): val = f"{color.red()},{color.green()},{color.blue()}"; reply = QMessageBox.question(self, "區域", "指定範圍？", QMessageBox.Yes | QMessageBox.No)
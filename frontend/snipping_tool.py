@@ -1,5 +1,6 @@
 import sys
 import os
+import tempfile
 from datetime import datetime
 from PySide6.QtWidgets import QWidget, QApplication, QInputDialog
 from PySide6.QtGui import QPainter, QColor, QPen, QGuiApplication, QPixmap
@@ -10,7 +11,7 @@ class SnippingWidget(QWidget):
 
     def __init__(self, mode='save'):
         """
-        mode: 'save' (截圖存檔) 或 'region' (只回傳座標)
+        mode: 'save' (截圖存檔)、'region' (只回傳座標) 或 'glyph' (點陣字樣本：回傳 '暫存圖檔路徑|文字')
         """
         super().__init__()
         self.mode = mode # ★ 記錄模式
@@ -61,7 +62,7 @@ class SnippingWidget(QWidget):
             
             painter.setPen(QColor(255, 255, 255))
             # 顯示資訊：如果是選區模式，顯示座標
-            if self.mode == 'region':
+            if self.mode in ('region', 'glyph'):
                 info_text = f"Region: {rect.x()},{rect.y()},{rect.width()},{rect.height()}"
             else:
                 info_text = f"{rect.width()} x {rect.height()}"
@@ -112,6 +113,19 @@ class SnippingWidget(QWidget):
             print(f"[選區] 座標: {region_str}")
             self.on_snipping_finish.emit(region_str)
             self.close()
+
+        elif self.mode == 'glyph':
+            # ★ 點陣字樣本：框選一行文字並輸入內容，由主視窗切字、存成字模
+            # 跟截圖存檔一樣從開啟選取時的畫面裁切 (主視窗恢復、對話框出現後再擷取會拍到自己的視窗)
+            cropped = self.full_screen_pixmap.copy(intersected_rect)
+            text, ok = QInputDialog.getText(None, "點陣字樣本", "框選範圍內的文字 (由左到右):")
+            if ok and text:
+                fd, filename = tempfile.mkstemp(prefix="glyph_", suffix=".png"); os.close(fd)
+                cropped.save(filename, "PNG")
+                self.on_snipping_finish.emit(f"{filename}|{text}")
+            else:
+                self.on_snipping_finish.emit("")
+            self.close()
             
         else:
             # ★ 既有模式：截圖存檔
@@ -32,7 +32,7 @@ class DropListWidget(QListWidget):
     def dropEvent(self, event):
         if event.mimeData().hasText():
             action_type = event.mimeData().text()
-            if action_type in ['Click', 'FindImg', 'OCR', 'FindColor', 'Wait', 'Key', 'SmartAction', 'IfImage', 'Label', 'Goto', 'LogicPlugin', 'Snip', 'Comment', 'Drag', 'Loop']:
+            if action_type in ['Click', 'FindImg', 'FindAllImg', 'OCR', 'OCRMulti', 'FindColor', 'Wait', 'Key', 'SmartAction', 'IfImage', 'Label', 'Goto', 'LogicPlugin', 'Snip', 'Comment', 'Drag', 'Loop', 'WaitUntil', 'WaitWhile']:
                 event.accept(); self.itemDropped.emit(action_type)
             else: super().dropEvent(event)
         else: super().dropEvent(event)
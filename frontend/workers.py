@@ -1,22 +1,23 @@
 # frontend/workers.py
 import time
 import os
-import json
-import cv2
 import numpy as np
-import difflib
-import re
-import importlib.util
 import traceback 
 import datetime 
 import random 
+from contextlib import nullcontext
 
 from PySide6.QtCore import QThread, Signal
 from pynput import keyboard
 import pyautogui
 
 from backend.logic_plugin import LogicPluginBase
-from backend.plugin_base import PluginBase
+from backend.text_match import TextMatcher
+from backend.stall_detector import StallDetector
+from backend import script_compiler
+from backend.script_compiler import compile_script, parse_args, ScriptCompileError, CompiledScript
+from backend.script_cache import ScriptCache
+from backend.plugin_registry import PluginRegistry
 
 # --- 鍵盤監聽 ---
 class KeyListener(QThread):
@@ -41,41 +42,27 @@ class WatchdogThread(QThread):
     warning_signal = Signal(str)
     emergency_signal = Signal()
     
-    def __init__(self, vision):
+    def __init__(self, vision, config=None):
         super().__init__()
         self.vision = vision
         self.is_running = True
-        self.last_img = None
-        self.static_count = 0
-        self.check_interval = 60 
-        self.max_static_minutes = 5 
+        # 區域 / 間隔 / 門檻見 watchdog_config.json，只保留縮圖，秒級間隔也幾乎不花成本
+        self.detector = StallDetector(vision, config)
+        self.check_interval = self.detector.interval
 
     def run(self):
-        self.warning_signal.emit("[看門狗] 🛡️ 安全監控已啟動...")
+        names = "、".join(r.name for r in self.detector.regions)
+        self.warning_signal.emit(f"[看門狗] 🛡️ 安全監控已啟動 (每 {self.check_interval:g} 秒檢查: {names})...")
         while self.is_running:
+            start = time.time()
             try:
-                current_img = self.vision.capture_screen()
-                if self.last_img is not None:
-                    gray1 = cv2.cvtColor(current_img, cv2.COLOR_BGR2GRAY)
-                    gray2 = cv2.cvtColor(self.last_img, cv2.COLOR_BGR2GRAY)
-                    err = np.sum((gray1.astype("float") - gray2.astype("float")) ** 2)
-                    err /= float(gray1.shape[0] * gray1.shape[1])
-                    if err < 50: 
-                        self.static_count += 1
-                        self.warning_signal.emit(f"[看門狗] ⚠️ 警告：畫面已靜止 {self.static_count} 分鐘")
-                    else:
-                        if self.static_count > 0:
-                            self.warning_signal.emit("[看門狗] ✅ 畫面恢復變動，計數歸零")
-                        self.static_count = 0
-                self.last_img = current_img
-                if self.static_count >= self.max_static_minutes:
-                    self.warning_signal.emit(f"[看門狗] 🚨 緊急：偵測到卡死超過 {self.max_static_minutes} 分鐘！強制停止！")
-                    self.emergency_signal.emit()
-                    self.static_count = 0 
+                for level, message in self.detector.check():
+                    self.warning_signal.emit(message)
+                    if level == 'emergency': self.emergency_signal.emit()
             except Exception: pass
-            for _ in range(self.check_interval):
-                if not self.is_running: break
-                time.sleep(1)
+            while self.is_running and time.time() - start < self.check_interval:
+                time.sleep(min(0.2, self.check_interval))
+        self.vision.release_grabber()
 
     def stop(self):
         self.is_running = False
@@ -85,14 +72,21 @@ class EngineBridge:
     def __init__(self, hardware, vision, log_callback, stop_check_callback):
         self.hw = hardware; self.vision = vision; self.log = log_callback; self.should_stop = stop_check_callback
 
+# --- 單次 execute_steps 的執行狀態 (子腳本各有一份) ---
+class _RunFrame:
+    def __init__(self, script, bridge, depth, variables):
+        self.script = script; self.bridge = bridge; self.depth = depth; self.variables = variables
+
 # --- 腳本執行器 ---
 class ScriptRunner(QThread):
     log_signal = Signal(str); finished_signal = Signal(); draw_rect_signal = Signal(int, int, int, int); draw_target_signal = Signal(int, int)
     
-    def __init__(self, task_objects, hardware, vision):
+    def __init__(self, task_objects, hardware, vision, script_cache=None, plugin_registry=None):
         super().__init__()
         self.hw = hardware
         self.vision = vision
+        self.script_cache = script_cache if script_cache is not None else ScriptCache() # 與編輯器共用時由外部傳入
+        self.plugin_registry = plugin_registry if plugin_registry is not None else PluginRegistry()
         self.is_running = True
         
         self.tasks = []
@@ -108,6 +102,16 @@ class ScriptRunner(QThread):
         self.loop_counters = {} 
         self.executed_mission_ids = set()
         self.current_priority = 999 
+        self.text_matchers = {} # (目標字串, 門檻) -> TextMatcher
+        # 步驟類型 -> 處理函式 (execute_steps 查表分派)
+        self.op_handlers = {
+            'Label': self._op_noop, 'Comment': self._op_noop, 'LogicPlugin': self._op_noop,
+            'Goto': self._op_goto, 'Loop': self._op_loop, 'IfImage': self._op_if_image, 'SmartAction': self._op_smart,
+            'Click': self._op_click, 'Key': self._op_key, 'Drag': self._op_drag,
+            'FindImg': self._op_find_img, 'FindAllImg': self._op_find_all_img, 'FindColor': self._op_find_color,
+            'OCR': self._op_ocr, 'OCRMulti': self._op_ocr_multi, 'WaitUntil': self._op_wait_until, 'WaitWhile': self._op_wait_until,
+            'Plugin': self._op_plugin, 'Wait': self._op_wait,
+        }
 
     def add_scheduled_task(self, task_info):
         boss_name = task_info.get('variables', {}).get('BOSS_NAME', 'Unknown')
@@ -161,6 +165,24 @@ class ScriptRunner(QThread):
             time.sleep(0.05)
         return True
 
+    def wait_ocr_ready(self, timeout=60, opts=None):
+        """等待 OCR 模型就緒 (可被停止 / 插隊打斷)，逾時或載入失敗回傳 False；點陣字步驟不需等待"""
+        if opts and opts.get('ocr') == 'glyph': return True
+        ocr = self.vision.ocr_backend()
+        if ocr.is_ready(): return True
+        self.log_signal.emit("⏳ 等待 OCR 模型載入...")
+        ocr.warmup()
+        start = time.time()
+        while time.time() - start < timeout:
+            if not self.is_running or self.check_for_interruption(): return False
+            if ocr.wait_ready(0.2): return True
+            if ocr.is_failed(): return False
+        return False
+
+    def log_vision_stats(self):
+        try: self.log_signal.emit(f"📊 視覺統計: {self.vision.format_stats()}")
+        except Exception: pass
+
     def _perform_idle_behavior(self):
         try:
             curr_x, curr_y = self.hw.get_real_position()
@@ -171,294 +193,412 @@ class ScriptRunner(QThread):
                 dx = random.randint(-20, 20); dy = random.randint(-20, 20); self.hw.move(curr_x + dx, curr_y + dy)
         except Exception: pass
     
-    def parse_val_region(self, val_str):
-        if "|" in str(val_str) and len(str(val_str).split("|")) >= 2:
-            parts = val_str.split("|"); possible_region = parts[-1]
-            if "," in possible_region and len(possible_region.split(',')) == 4:
-                try: rx, ry, rw, rh = map(int, possible_region.split(',')); main_val = "|".join(parts[:-1]); return main_val, (rx, ry, rw, rh)
-                except: pass
-        return val_str, None
-
-    def parse_smart_val(self, val_str):
-        parts = val_str.split('|'); region = None
-        if len(parts) >= 1 and "," in parts[-1] and len(parts[-1].split(',')) == 4:
-            try: map(int, parts[-1].split(',')); region = tuple(map(int, parts[-1].split(','))); parts = parts[:-1]
-            except: pass
-        while len(parts) < 7: parts.append("")
-        return parts, region
+    def parse_val_region(self, val_str): return script_compiler.parse_val_region(val_str)
+    def parse_smart_val(self, val_str): return script_compiler.parse_smart_val(val_str)
+
+    def _ocr_kwargs(self, opts, default_mode=None):
+        """步驟選項 -> ocr_screen / ocr_regions 參數 ('recog' 僅辨識 / 'glyph' 點陣字)"""
+        mode = opts.get('ocr', default_mode)
+        if mode == 'glyph': return {'glyph_font': opts.get('font', 'default')}
+        return {'recog_only': mode == 'recog', 'allowlist': opts.get('allow')}
+
+    def parse_ocr_fields(self, val_str): return script_compiler.parse_ocr_fields(val_str)
+    def parse_probes(self, val_str, tolerance=20): return script_compiler.parse_probes(val_str, tolerance)
+
+    def _probe_condition(self, cond, target, region, threshold, opts):
+        """WaitUntil / WaitWhile 的單次判斷"""
+        if cond == 'FindImg':
+            return self.vision.find_image(target, confidence=threshold, region=region, mode=opts.get('match')) is not None
+        if cond == 'FindColor':
+            return self.vision.find_color(self.parse_colors(target), tolerance=int(threshold), region=region) is not None
+        if cond == 'Pixel':
+            return bool(self.vision.check_pixels(self.parse_probes(target, int(threshold))).all())
+        if cond == 'OCR':
+            res = self.vision.ocr_screen(region=region, **self._ocr_kwargs(opts))
+            return self.get_text_matcher(target, threshold).best(res, key=lambda item: item[1]) is not None
+        raise ValueError(f"未知的條件類型: {cond}")
+
+    def wait_for_condition(self, cond, target, region, threshold, timeout, until=True, opts=None):
+        """
+        等到條件成立 (until=True) 或不再成立 (until=False)
+        - 先比區域指紋，畫面沒變就不重跑比對 (最久 force_check 秒仍會強制判斷一次)
+        - 畫面沒變時輪詢間隔逐步拉長，一有變動就回到最短；有背景擷取服務時改等新畫面通知
+        - 停止 / 插隊時立即返回
+        回傳 (True 達成 / False 逾時 / None 被中斷, 統計)
+        """
+        opts = opts or {}
+        min_poll, max_poll, force_check = 0.03, 0.25, 1.0
+        if cond == 'Pixel':
+            probes = self.parse_probes(target)
+            xs = [p[0] for p in probes]; ys = [p[1] for p in probes]
+            watch = (min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
+        else: watch = region
+
+        start = time.time(); poll = min_poll
+        last_fp = None; last_check = 0.0; prev_poll = start; seq = 0
+        stats = {'checks': 0, 'skipped': 0, 'elapsed': 0.0, 'latency': 0.0}
+        while True:
+            if not self.is_running or self.check_for_interruption(): return None, stats
+            now = time.time()
+            service = self.vision.capture_service
+            # 沒有背景擷取時釘選一張畫面，指紋與判斷共用同一次擷取
+            with (nullcontext() if service is not None else self.vision.snapshot(watch)):
+                fp = self.vision.region_fingerprint(watch)
+                changed = self.vision.fingerprint_changed(last_fp, fp)
+                if changed or now - last_check >= force_check:
+                    stats['checks'] += 1; last_check = now
+                    if self._probe_condition(cond, target, region, threshold, opts) == until:
+                        stats['elapsed'] = time.time() - start
+                        stats['latency'] = time.time() - prev_poll # 畫面變化發生在上一次輪詢之後，這是偵測延遲的上限
+                        return True, stats
+                else: stats['skipped'] += 1
+            last_fp = fp; prev_poll = now
+            if time.time() - start >= timeout:
+                stats['elapsed'] = time.time() - start
+                return False, stats
+
+            poll = min_poll if changed else min(max_poll, poll * 1.5)
+            wait = min(poll, max(0.0, start + timeout - time.time()))
+            deadline = time.time() + wait
+            if service is not None:
+                seq = service.wait_frame(seq, timeout=wait) # 新畫面一到就醒來
+            else:
+                while time.time() < deadline:
+                    if not self.is_running: break
+                    time.sleep(min(0.02, max(0.0, deadline - time.time())))
+
+    def parse_colors(self, val_str): return script_compiler.parse_colors(val_str)
+
+    def get_text_matcher(self, target, threshold=0.5):
+        """同一組目標 (以 ; 分隔多個，例如多隻 BOSS 名稱) 只正規化一次"""
+        key = (str(target), threshold)
+        matcher = self.text_matchers.get(key)
+        if matcher is None:
+            if len(self.text_matchers) > 64: self.text_matchers.clear()
+            matcher = self.text_matchers[key] = TextMatcher([t for t in str(target).split(';') if t.strip()], threshold)
+        return matcher
 
     def is_text_match(self, target, detected_text, threshold=0.5):
-        clean_t = re.sub(r'\s+', '', str(target)); clean_d = re.sub(r'\s+', '', str(detected_text))
-        if not clean_t or not clean_d: return False
-        if clean_t in clean_d: return True
-        hits = sum(1 for c in clean_t if c in clean_d)
-        simple_ratio = hits / len(clean_t) if len(clean_t) > 0 else 0
-        matcher = difflib.SequenceMatcher(None, clean_t, clean_d)
-        diff_ratio = matcher.ratio()
-        return diff_ratio >= threshold or simple_ratio >= threshold
-
-    # ★ 新增：動態載入插件的 helper
+        return self.get_text_matcher(target, threshold).match(detected_text)
+
+    def find_text_pos(self, target, ocr_result, region, threshold=0.5):
+        """在 OCR 結果中找分數最高的符合行，回傳其左側中點的全域座標 (找不到回傳 None)"""
+        hit = self.get_text_matcher(target, threshold).best(ocr_result, key=lambda item: item[1])
+        if hit is None: return None
+        matched, (bbox, text, conf), score = hit
+        if ';' in str(target): self.log_signal.emit(f"   🎯 命中: '{matched}' ← '{text}' ({score:.2f})")
+        anchor_x = int(bbox[0][0])
+        anchor_y = int((bbox[0][1] + bbox[2][1]) / 2)
+        if region: return (region[0] + anchor_x, region[1] + anchor_y)
+        return (self.vision.monitor_rect['left'] + anchor_x, self.vision.monitor_rect['top'] + anchor_y)
+
     def _load_plugin_instance(self, filename):
-        try:
-            name = os.path.splitext(os.path.basename(filename))[0]
-            path = os.path.join("extensions", filename)
-            if not os.path.exists(path): return None
-            
-            spec = importlib.util.spec_from_file_location(name, path)
-            module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(module)
-            for attr_name in dir(module):
-                attr = getattr(module, attr_name)
-                if isinstance(attr, type) and issubclass(attr, PluginBase) and attr is not PluginBase:
-                    return attr()
-        except: pass
-        return None
+        """插件實例由登錄表快取，檔案有變動才重新匯入"""
+        return self.plugin_registry.get_instance(filename)
+
+    _END = object() # 處理函式回傳此值代表結束本腳本
+
+    def _jump(self, op, args, field, frame):
+        """跳轉目標的步驟索引：編譯時已解析；含變數的步驟執行時查標籤表 (找不到回傳 None)"""
+        if field in op.jumps: return op.jumps[field]
+        return frame.script.label_index(args[field])
+
+    def _log_compile_error(self, error):
+        self.log_signal.emit(f"❌ 腳本有 {len(error.errors)} 個錯誤，未執行:")
+        for line in error.errors: self.log_signal.emit(f"   {line}")
+
+    def load_script(self, path):
+        """
+        從快取取得編譯好的腳本 (檔案有變動才重新讀取 / 編譯，此時才記錄警告與錯誤)
+        編譯失敗回傳 None；檔案不存在 / JSON 錯誤照常丟出例外
+        """
+        entry, fresh = self.script_cache.load(path)
+        if fresh: # 警告與錯誤都只在重新編譯時記錄一次，排程器之後再挑到同一個檔案不重複洗版
+            if entry.error is not None: self._log_compile_error(entry.error)
+            for warning in (entry.script.warnings if entry.script else []): self.log_signal.emit(f"⚠️ {os.path.basename(path)}: {warning}")
+        return entry.script
+
+    def _run_sub_script(self, path, frame):
+        if os.path.exists(path):
+            sub_script = self.load_script(path)
+            if sub_script is not None: self.execute_steps(sub_script, frame.bridge, frame.depth + 1, frame.variables)
+
+    def _click_at(self, x, y):
+        self.draw_target_signal.emit(x, y)
+        self.hw.move(x, y)
+        time.sleep(0.15) # ★ 安全緩衝
+        self.hw.click()
 
     def execute_steps(self, steps, engine_bridge, depth=0, variables=None):
+        """
+        先把步驟編譯成 Op (參數預先解析、標籤換成索引)，再依步驟類型查表執行
+        各處理函式回傳 None 代表往下一步、整數代表跳到該索引、_END 代表結束本腳本 (停止 / 插隊)
+        """
         if depth > 3: self.log_signal.emit("❌ 錯誤: 腳本巢狀層數過深"); return
+        if isinstance(steps, CompiledScript): script = steps # 從 load_script 取得的已編譯腳本 (警告已在載入時記錄)
+        else:
+            try: script = compile_script(steps)
+            except ScriptCompileError as e: self._log_compile_error(e); return
+            for warning in script.warnings: self.log_signal.emit(f"⚠️ {warning}")
+        if script.uses_ocr: self.vision.ocr_backend().warmup() # 有 OCR 步驟就先在背景載入模型
+
+        frame = _RunFrame(script, engine_bridge, depth, variables)
+        ops = script.ops
         i = 0
-        while i < len(steps):
+        while i < len(ops):
             if not self.is_running: break
             
             if self.check_for_interruption():
                 self.log_signal.emit("🛑 腳本已中斷 (讓位給緊急任務)")
                 return
 
-            step = steps[i]; action = step['type']; raw_val = step['val']
-            val = self._apply_variables(raw_val, variables)
-            real_val, region = self.parse_val_region(val); region_msg = f" (範圍: {region})" if region else ""
-            fatigue = self.hw.brain.get_reaction_multiplier()
-
-            if action == 'Label': pass
-            elif action == 'Goto':
-                target = real_val; found = False
-                for idx, s in enumerate(steps):
-                    if s['type'] == 'Label' and s['val'] == target: i = idx; found = True; self.log_signal.emit(f"🔀 跳轉至: {target}"); break
-                if not found: self.log_signal.emit(f"❌ 錯誤: 找不到標籤 {target}")
-            
-            elif action == 'Loop':
-                try:
-                    parts = val.split('|')
-                    target_label = parts[0]
-                    max_count = int(parts[1])
-                    fail_act = parts[2] if len(parts) > 2 else "Stop"
-                    fail_param = parts[3] if len(parts) > 3 else ""
-
-                    current = self.loop_counters.get(target_label, 0) + 1
-                    
-                    if current <= max_count:
-                        self.loop_counters[target_label] = current
-                        self.log_signal.emit(f"🔁 循環: {target_label} ({current}/{max_count})")
-                        found = False
-                        for idx, s in enumerate(steps):
-                            if s['type'] == 'Label' and s['val'] == target_label:
-                                i = idx; found = True; break
-                        if not found: self.log_signal.emit(f"❌ 錯誤: 找不到標籤 {target_label}")
-                        should_inc = False 
-                    else:
-                        self.log_signal.emit(f"🛑 循環上限 ({max_count})，執行: {fail_act}")
-                        self.loop_counters[target_label] = 0 
-                        if fail_act == "Stop":
-                            self.is_running = False
-                            self.log_signal.emit(">>> 因循環超時，腳本強制停止")
-                        elif fail_act == "Goto":
-                             found = False
-                             for idx, s in enumerate(steps):
-                                 if s['type'] == 'Label' and s['val'] == fail_param:
-                                     i = idx; found = True; self.log_signal.emit(f"🔀 [超時] 跳轉至例外處理: {fail_param}"); break
-                             if found: should_inc = False
-                             else: self.log_signal.emit(f"❌ 錯誤: 找不到失敗跳轉標籤 {fail_param}")
-                except Exception as e: self.log_signal.emit(f"❌ 循環錯誤: {e}")
-
-            elif action == 'LogicPlugin': pass
-            elif action == 'IfImage':
-                parts = str(val).split('|'); img_path = parts[0]; jump_label = parts[-1]; chk_region = None
-                if len(parts) > 2:
-                    try: chk_region = tuple(map(int, parts[1].split(',')))
-                    except: pass
-                if region: self.draw_rect_signal.emit(*region)
-                if os.path.exists(img_path):
-                    self.log_signal.emit(f"❓ 判斷: {img_path}")
-                    if self.vision.find_image(img_path, region=chk_region):
-                        self.log_signal.emit(f"✅ 條件成立！跳至 {jump_label}")
-                        for idx, s in enumerate(steps):
-                            if s['type'] == 'Label' and s['val'] == jump_label: i = idx; break
-                    else: self.log_signal.emit("❌ 條件不成立")
-            elif action == 'SmartAction':
-                try:
-                    parts, region = self.parse_smart_val(val)
-                    cond_type, target = parts[0], parts[1]
-                    succ_act, succ_param = parts[2], parts[3]
-                    fail_act, fail_param = parts[4], parts[5]
-                    try: threshold_val = float(parts[6])
-                    except: threshold_val = 0.8 
-                    
-                    self.log_signal.emit(f"🧠 智慧判斷: {cond_type} '{target}' (閥值:{threshold_val})...")
-                    
-                    found_pos = None
-                    if cond_type == 'FindImg':
-                        if os.path.exists(target):
-                            if region: self.draw_rect_signal.emit(*region)
-                            found_pos = self.vision.find_image(target, confidence=threshold_val, region=region)
-                    elif cond_type == 'OCR':
-                        if region: self.draw_rect_signal.emit(*region)
-                        res = self.vision.ocr_screen(region=region)
-                        detected_texts = [item[1] for item in res]
-                        self.log_signal.emit(f"   📋 OCR: {detected_texts}")
-                        for item in res:
-                            bbox, text, conf = item
-                            if self.is_text_match(target, text, threshold=threshold_val):
-                                anchor_x = int(bbox[0][0] / 3) 
-                                anchor_y = int((bbox[0][1] + bbox[2][1]) / 2 / 3)
-                                if region: found_pos = (region[0] + anchor_x, region[1] + anchor_y)
-                                else:
-                                    offset_x = self.vision.monitor_rect['left']
-                                    offset_y = self.vision.monitor_rect['top']
-                                    found_pos = (offset_x + anchor_x, offset_y + anchor_y)
-                                break
-                    elif cond_type == 'FindColor':
-                        rgb = tuple(map(int, target.split(',')))
-                        found_pos = self.vision.find_color(rgb, tolerance=int(threshold_val), region=region)
-                    
-                    if found_pos:
-                        self.log_signal.emit(f"   ✅ 執行: {succ_act}")
-                        if succ_act == 'ClickTarget' and found_pos: 
-                            self.draw_target_signal.emit(found_pos[0], found_pos[1]); 
-                            self.hw.move(found_pos[0], found_pos[1]); 
-                            time.sleep(0.15) # ★ 安全緩衝
-                            self.hw.click()
-                        elif succ_act == 'ClickOffset' and found_pos:
-                            off_x, off_y = map(int, succ_param.split(',')); final_x = found_pos[0] + off_x; final_y = found_pos[1] + off_y; 
-                            self.draw_target_signal.emit(final_x, final_y); 
-                            self.hw.move(final_x, final_y); 
-                            time.sleep(0.15) # ★ 安全緩衝
-                            self.hw.click()
-                        elif succ_act == 'RunScript':
-                            if os.path.exists(succ_param):
-                                with open(succ_param, 'r', encoding='utf-8') as f: sub_steps = json.load(f)
-                                self.execute_steps(sub_steps, engine_bridge, depth + 1, variables)
-                        elif succ_act == 'Goto':
-                            for idx, s in enumerate(steps):
-                                if s['type'] == 'Label' and s['val'] == succ_param: i = idx; break
-                        elif succ_act == 'Stop': self.is_running = False
-                    else: 
-                        self.log_signal.emit("   ⚠️ 條件未成立")
-                        if fail_act == 'Goto':
-                            for idx, s in enumerate(steps):
-                                if s['type'] == 'Label' and s['val'] == fail_param: i = idx; break
-                        elif fail_act == 'RunScript':
-                            if os.path.exists(fail_param):
-                                with open(fail_param, 'r', encoding='utf-8') as f: sub_steps = json.load(f)
-                                self.execute_steps(sub_steps, engine_bridge, depth + 1, variables)
-                        elif fail_act == 'Stop': self.is_running = False
-                except Exception as e: self.log_signal.emit(f"❌ 智慧錯誤: {e}")
-
-            elif action == 'Click':
-                try: coords = real_val.split(','); x, y = int(coords[0]), int(coords[1]); self.draw_target_signal.emit(x, y); self.hw.move(x, y); self.hw.click()
-                except: pass
-            elif action == 'Key': self.hw.press(int(real_val))
-            elif action == 'Drag':
-                try:
-                    parts = val.split('|')
-                    start_coords = parts[0].split(',')
-                    end_coords = parts[1].split(',')
-                    start_x, start_y = int(start_coords[0]), int(start_coords[1])
-                    end_x, end_y = int(end_coords[0]), int(end_coords[1])
-                    self.log_signal.emit(f"↔️ 拖曳: ({start_x},{start_y}) -> ({end_x},{end_y})")
-                    self.hw.drag(start_x, start_y, end_x, end_y)
-                except Exception as e: self.log_signal.emit(f"❌ 拖曳錯誤: {e}")
-            elif action == 'FindImg':
-                if os.path.exists(real_val):
-                    self.log_signal.emit(f"👁️ 尋找: {real_val}{region_msg}")
-                    if region: self.draw_rect_signal.emit(*region)
-                    pos = self.vision.find_image(real_val, region=region)
-                    if pos: 
-                        self.draw_target_signal.emit(pos[0], pos[1]); 
-                        self.hw.move(pos[0], pos[1]); 
-                        time.sleep(0.15) # ★ 安全緩衝
-                        self.hw.click()
-                    else: self.log_signal.emit("⚠️ 沒找到")
-            elif action == 'OCR':
-                target_text = str(real_val).strip(); self.log_signal.emit(f"🔤 OCR: '{target_text}'{region_msg}...")
-                try:
-                    if region: self.draw_rect_signal.emit(*region)
-                    res = self.vision.ocr_screen(region=region)
-                    detected_texts = [item[1] for item in res]
-                    self.log_signal.emit(f"   📋 讀到: {detected_texts}")
-                    found_pos = None
-                    for item in res:
-                        bbox, text, conf = item
-                        if self.is_text_match(target_text, text, threshold=0.5):
-                            anchor_x = int(bbox[0][0] / 3) 
-                            anchor_y = int((bbox[0][1] + bbox[2][1]) / 2 / 3)
-                            if region: found_pos = (region[0] + anchor_x, region[1] + anchor_y)
-                            else:
-                                offset_x = self.vision.monitor_rect['left']
-                                offset_y = self.vision.monitor_rect['top']
-                                found_pos = (offset_x + anchor_x, offset_y + anchor_y)
-                            break
-                    if found_pos: 
-                        self.log_signal.emit(f"✅ 發現！點擊: {found_pos}")
-                        self.draw_target_signal.emit(found_pos[0], found_pos[1])
-                        self.hw.move(found_pos[0], found_pos[1])
-                        time.sleep(0.15) # ★ 安全緩衝
-                        self.hw.click()
-                    else: self.log_signal.emit(f"⚠️ 未發現")
-                except Exception as e: self.log_signal.emit(f"❌ OCR 錯誤: {e}")
-            elif action == 'FindColor':
-                try:
-                    rgb = tuple(map(int, real_val.split(','))); self.log_signal.emit(f"🎨 找色: RGB{rgb}{region_msg}")
-                    pos = self.vision.find_color(rgb, tolerance=20, region=region)
-                    if pos: 
-                        self.draw_target_signal.emit(pos[0], pos[1]); 
-                        self.hw.move(pos[0], pos[1]); 
-                        time.sleep(0.15) # ★ 安全緩衝
-                        self.hw.click(); 
-                        self.log_signal.emit(f"✅ 發現顏色！")
-                    else: self.log_signal.emit("⚠️ 未發現")
-                except Exception as e: self.log_signal.emit(f"❌ 找色錯誤: {e}")
-            
-            # ★ 修改：現在 Plugin 存的是「檔名 (String)」，不是物件
-            # 我們需要動態載入它
-            elif action == 'Plugin': 
-                plugin_instance = self._load_plugin_instance(str(real_val))
-                if plugin_instance:
-                    plugin_instance.run(engine_bridge)
-                else:
-                    self.log_signal.emit(f"❌ 錯誤: 無法載入插件 {real_val}")
-
-            elif action == 'Wait':
-                try:
-                    base_wait = float(real_val)
-                    final_wait = self.hw.brain.get_human_wait(base_wait)
-                    self.log_signal.emit(f"⏳ 等待 {base_wait}s (擬人化->{final_wait:.2f}s)")
-                    if not self.smart_sleep(final_wait):
-                        if not self.is_running: break 
-                        else: return # 插隊中斷
-                except: pass
-            
-            elif action == 'Comment': pass 
+            op = ops[i]; args = op.args
+            if op.dynamic:
+                try: args = parse_args(op.type, self._apply_variables(op.raw, frame.variables))
+                except ValueError as e: self.log_signal.emit(f"❌ 第 {op.index + 1} 步 ({op.type}): {e}"); args = None
 
-            should_inc = True
-            if action == 'Goto' or action == 'Loop': should_inc = False
-            if action == 'SmartAction': pass
-            if should_inc: i += 1
+            target = self.op_handlers[op.type](op, args, frame) if args is not None else None
+            if target is self._END: return
+            i = op.index + 1 if target is None else target
             
             # 間隔時間
-            base_gap = 0.1
-            if action in ['FindImg', 'OCR', 'FindColor', 'SmartAction', 'IfImage']:
-                base_gap = random.uniform(0.5, 0.8)
-            elif action in ['Click', 'Key', 'Drag']:
-                base_gap = random.uniform(0.1, 0.3)
-            elif action in ['Label', 'Goto', 'Loop', 'Comment']:
-                base_gap = 0.01
-
-            step_gap = self.hw.brain.get_human_wait(base_gap)
+            low, high = op.gap
+            step_gap = self.hw.brain.get_human_wait(low if low == high else random.uniform(low, high))
             
             if not self.smart_sleep(step_gap):
                  if not self.is_running: break
                  else: return # 插隊中斷
 
+    # --- 各步驟的處理函式 (op, 已解析參數, 執行狀態) ---
+    def _op_noop(self, op, args, frame): return None
+
+    def _op_goto(self, op, args, frame):
+        idx = self._jump(op, args, 'label', frame)
+        if idx is None: self.log_signal.emit(f"❌ 錯誤: 找不到標籤 {args['label']}"); return op.index # 與舊版相同：停在此步
+        self.log_signal.emit(f"🔀 跳轉至: {args['label']}")
+        return idx # 跳到 Label 本身 (不前進)
+
+    def _op_loop(self, op, args, frame):
+        target_label, max_count = args['label'], args['count']
+        fail_act, fail_param = args['fail_act'], args['fail_param']
+        try:
+            current = self.loop_counters.get(target_label, 0) + 1
+            if current <= max_count:
+                self.loop_counters[target_label] = current
+                self.log_signal.emit(f"🔁 循環: {target_label} ({current}/{max_count})")
+                idx = self._jump(op, args, 'label', frame)
+                if idx is not None: return idx
+                self.log_signal.emit(f"❌ 錯誤: 找不到標籤 {target_label}")
+                return op.index # 停在此步繼續計數，到達上限後仍會執行失敗動作
+            self.log_signal.emit(f"🛑 循環上限 ({max_count})，執行: {fail_act}")
+            self.loop_counters[target_label] = 0 
+            if fail_act == "Stop":
+                self.is_running = False
+                self.log_signal.emit(">>> 因循環超時，腳本強制停止")
+            elif fail_act == "Goto":
+                idx = self._jump(op, args, 'fail_param', frame)
+                if idx is not None:
+                    self.log_signal.emit(f"🔀 [超時] 跳轉至例外處理: {fail_param}")
+                    return idx
+                self.log_signal.emit(f"❌ 錯誤: 找不到失敗跳轉標籤 {fail_param}")
+        except Exception as e: self.log_signal.emit(f"❌ 循環錯誤: {e}")
+        return op.index # 與舊版相同：Loop 不前進，計數歸零後下一輪重新判斷
+
+    def _op_if_image(self, op, args, frame):
+        img_path, jump_label = args['path'], args['label']
+        if args['region']: self.draw_rect_signal.emit(*args['region'])
+        if os.path.exists(img_path):
+            self.log_signal.emit(f"❓ 判斷: {img_path}")
+            if self.vision.find_image(img_path, region=args['check_region'], mode=op.opts.get('match')):
+                self.log_signal.emit(f"✅ 條件成立！跳至 {jump_label}")
+                idx = self._jump(op, args, 'label', frame)
+                if idx is not None: return idx + 1
+            else: self.log_signal.emit("❌ 條件不成立")
+        return None
+
+    def _op_smart(self, op, args, frame):
+        opts = op.opts; region = args['region']
+        cond_type, target, threshold_val = args['cond'], args['target'], args['threshold']
+        try:
+            self.log_signal.emit(f"🧠 智慧判斷: {cond_type} '{target}' (閥值:{threshold_val})...")
+            
+            found_pos = None
+            if cond_type == 'FindImg':
+                # 多個候選圖以 ; 分隔 (例如選單 / 關閉鈕 / 確認框)，一次擷取批次比對，依序取第一個找到的
+                candidates = [p for p in target.split(';') if p and os.path.exists(p)]
+                if len(candidates) > 1:
+                    if region: self.draw_rect_signal.emit(*region)
+                    hits = self.vision.find_images(candidates, confidence=threshold_val, region=region, mode=opts.get('match'), workers=2)
+                    for p, hit in zip(candidates, hits):
+                        if hit: found_pos = hit; self.log_signal.emit(f"   🎯 命中: {p}"); break
+                elif candidates:
+                    if region: self.draw_rect_signal.emit(*region)
+                    found_pos = self.vision.find_image(candidates[0], confidence=threshold_val, region=region, mode=opts.get('match'))
+            elif cond_type == 'OCR':
+                if not self.wait_ocr_ready(opts=opts): raise RuntimeError("OCR 模型未就緒")
+                if region: self.draw_rect_signal.emit(*region)
+                res = self.vision.ocr_screen(region=region, **self._ocr_kwargs(opts))
+                detected_texts = [item[1] for item in res]
+                self.log_signal.emit(f"   📋 OCR: {detected_texts}")
+                found_pos = self.find_text_pos(target, res, region, threshold=threshold_val)
+            elif cond_type == 'FindColor':
+                found_pos = self.vision.find_color(args['colors'], tolerance=int(threshold_val), region=region,
+                                                   pick=opts.get('pick', 'first'), near=self.hw.get_real_position() if opts.get('pick') == 'nearest' else None)
+            
+            if found_pos:
+                succ_act, succ_param = args['succ_act'], args['succ_param']
+                self.log_signal.emit(f"   ✅ 執行: {succ_act}")
+                if succ_act == 'ClickTarget': self._click_at(found_pos[0], found_pos[1])
+                elif succ_act == 'ClickOffset': self._click_at(found_pos[0] + succ_param[0], found_pos[1] + succ_param[1])
+                elif succ_act == 'RunScript': self._run_sub_script(succ_param, frame)
+                elif succ_act == 'Goto':
+                    idx = self._jump(op, args, 'succ_param', frame)
+                    if idx is not None: return idx + 1
+                elif succ_act == 'Stop': self.is_running = False
+            else: 
+                fail_act, fail_param = args['fail_act'], args['fail_param']
+                self.log_signal.emit("   ⚠️ 條件未成立")
+                if fail_act == 'Goto':
+                    idx = self._jump(op, args, 'fail_param', frame)
+                    if idx is not None: return idx + 1
+                elif fail_act == 'RunScript': self._run_sub_script(fail_param, frame)
+                elif fail_act == 'Stop': self.is_running = False
+        except Exception as e: self.log_signal.emit(f"❌ 智慧錯誤: {e}")
+        return None
+
+    def _op_click(self, op, args, frame):
+        x, y = args['pos']
+        try: self.draw_target_signal.emit(x, y); self.hw.move(x, y); self.hw.click()
+        except: pass
+        return None
+
+    def _op_key(self, op, args, frame):
+        self.hw.press(args['code'])
+        return None
+
+    def _op_drag(self, op, args, frame):
+        try:
+            (start_x, start_y), (end_x, end_y) = args['start'], args['end']
+            self.log_signal.emit(f"↔️ 拖曳: ({start_x},{start_y}) -> ({end_x},{end_y})")
+            self.hw.drag(start_x, start_y, end_x, end_y)
+        except Exception as e: self.log_signal.emit(f"❌ 拖曳錯誤: {e}")
+        return None
+
+    def _op_find_img(self, op, args, frame):
+        path, region = args['target'], args['region']
+        if os.path.exists(path):
+            self.log_signal.emit(f"👁️ 尋找: {path}{self._region_msg(region)}")
+            if region: self.draw_rect_signal.emit(*region)
+            pos = self.vision.find_image(path, region=region, mode=op.opts.get('match'))
+            if pos: self._click_at(pos[0], pos[1])
+            else: self.log_signal.emit("⚠️ 沒找到")
+        return None
+
+    def _op_find_all_img(self, op, args, frame):
+        path, region = args['target'], args['region']
+        if os.path.exists(path):
+            self.log_signal.emit(f"👁️ 尋找全部: {path}{self._region_msg(region)}")
+            if region: self.draw_rect_signal.emit(*region)
+            # 由游標目前位置由近到遠依序點擊每個實例
+            hits = self.vision.find_all_images(path, region=region, sort='distance', origin=self.hw.get_real_position())
+            if hits: self.log_signal.emit(f"   📋 共找到 {len(hits)} 個")
+            else: self.log_signal.emit("⚠️ 沒找到")
+            for hit_x, hit_y, _ in hits:
+                if not self.is_running: break
+                self._click_at(hit_x, hit_y)
+                time.sleep(self.hw.brain.get_human_wait(0.2))
+        return None
+
+    def _op_ocr(self, op, args, frame):
+        target_text, region = args['target'], args['region']
+        self.log_signal.emit(f"🔤 OCR: '{target_text}'{self._region_msg(region)}...")
+        try:
+            if not self.wait_ocr_ready(opts=op.opts): raise RuntimeError("OCR 模型未就緒")
+            if region: self.draw_rect_signal.emit(*region)
+            res = self.vision.ocr_screen(region=region, **self._ocr_kwargs(op.opts))
+            detected_texts = [item[1] for item in res]
+            self.log_signal.emit(f"   📋 讀到: {detected_texts}")
+            found_pos = self.find_text_pos(target_text, res, region, threshold=0.5)
+            if found_pos: 
+                self.log_signal.emit(f"✅ 發現！點擊: {found_pos}")
+                self._click_at(found_pos[0], found_pos[1])
+            else: self.log_signal.emit(f"⚠️ 未發現")
+        except Exception as e: self.log_signal.emit(f"❌ OCR 錯誤: {e}")
+        return None
+
+    def _op_ocr_multi(self, op, args, frame):
+        # 一次擷取、批次讀取多個固定欄位，結果存成變數，後續步驟用 {名稱} 取用
+        fields = args['fields']
+        try:
+            self.log_signal.emit(f"🔢 多區讀字: {', '.join(name for name, _ in fields)}")
+            if not self.wait_ocr_ready(opts=op.opts): raise RuntimeError("OCR 模型未就緒")
+            for _, rect in fields: self.draw_rect_signal.emit(*rect)
+            batch = self.vision.ocr_regions([rect for _, rect in fields], **self._ocr_kwargs(op.opts, 'recog'))
+            variables = dict(frame.variables or {}) # 不改動呼叫端 (預約任務) 的變數表
+            for (name, _), res in zip(fields, batch):
+                variables[name] = "".join(item[1] for item in res)
+            frame.variables = variables
+            self.log_signal.emit(f"   📋 讀到: {', '.join(f'{name}={variables[name]}' for name, _ in fields)}")
+        except Exception as e: self.log_signal.emit(f"❌ 多區 OCR 錯誤: {e}")
+        return None
+
+    def _op_wait_until(self, op, args, frame):
+        # 'FindImg|路徑|逾時秒數|門檻|逾時動作|逾時參數|x,y,w,h' (條件: FindImg / FindColor / Pixel / OCR)
+        cond, target, wait_region = args['cond'], args['target'], args['region']
+        timeout, threshold = args['timeout'], args['threshold']
+        fail_act = args['fail_act']
+        until = op.type == 'WaitUntil'
+        try:
+            self.log_signal.emit(f"{'⏳ 等到出現' if until else '⏳ 等到消失'}: {cond} '{target}' (最多 {timeout:g} 秒)")
+            # 模板不存在時 find_image 永遠回傳 None：WaitWhile 會立刻成立、WaitUntil 空等到逾時，直接報錯不等待
+            if cond == 'FindImg' and not os.path.exists(target): raise FileNotFoundError(f"找不到圖片 {target}")
+            if cond == 'OCR' and not self.wait_ocr_ready(opts=op.opts): raise RuntimeError("OCR 模型未就緒")
+            if wait_region: self.draw_rect_signal.emit(*wait_region)
+            ok, stats = self.wait_for_condition(cond, target, wait_region, threshold, timeout, until, op.opts)
+            if ok is None: return self._END # 停止或插隊中斷
+            if ok:
+                self.log_signal.emit(f"   ✅ 條件達成 (等待 {stats['elapsed']:.2f}s，偵測延遲 ≤ {stats['latency'] * 1000:.0f}ms，"
+                                     f"比對 {stats['checks']} 次 / 畫面未變略過 {stats['skipped']} 次)")
+            else:
+                self.log_signal.emit(f"   ⌛ 等待逾時 ({timeout:g}s，比對 {stats['checks']} 次 / 略過 {stats['skipped']} 次)，執行: {fail_act or 'Continue'}")
+                if fail_act == 'Goto':
+                    idx = self._jump(op, args, 'fail_param', frame)
+                    if idx is not None: return idx + 1
+                elif fail_act == 'Stop': self.is_running = False
+        except Exception as e: self.log_signal.emit(f"❌ 等待錯誤: {e}")
+        return None
+
+    def _op_find_color(self, op, args, frame):
+        colors, region = args['colors'], args['region']
+        try:
+            self.log_signal.emit(f"🎨 找色: RGB{' / '.join(map(str, colors))}{self._region_msg(region)}")
+            pos = self.vision.find_color(colors, tolerance=20, region=region,
+                                         pick=op.opts.get('pick', 'first'), near=self.hw.get_real_position() if op.opts.get('pick') == 'nearest' else None)
+            if pos: 
+                self._click_at(pos[0], pos[1])
+                self.log_signal.emit(f"✅ 發現顏色！")
+            else: self.log_signal.emit("⚠️ 未發現")
+        except Exception as e: self.log_signal.emit(f"❌ 找色錯誤: {e}")
+        return None
+
+    # ★ Plugin 存的是「檔名 (String)」，執行時動態載入
+    def _op_plugin(self, op, args, frame):
+        plugin_instance = self._load_plugin_instance(args['name'])
+        if plugin_instance: plugin_instance.run(frame.bridge)
+        else: self.log_signal.emit(f"❌ 錯誤: 無法載入插件 {args['name']}")
+        return None
+
+    def _op_wait(self, op, args, frame):
+        base_wait = args['seconds']
+        final_wait = self.hw.brain.get_human_wait(base_wait)
+        self.log_signal.emit(f"⏳ 等待 {base_wait}s (擬人化->{final_wait:.2f}s)")
+        if not self.smart_sleep(final_wait): return self._END # 停止或插隊中斷
+        return None
+
+    @staticmethod
+    def _region_msg(region):
+        return f" (範圍: {region})" if region else ""
+
     def run(self):
         self.log_signal.emit(">>> 🚀 智慧排程器啟動 (Scheduler Mode)")
         engine_bridge = EngineBridge(self.hw, self.vision, lambda msg: self.log_signal.emit(msg), lambda: not self.is_running)
@@ -497,11 +637,12 @@ class ScriptRunner(QThread):
                     
                     if os.path.exists(script_file):
                         try:
-                            with open(script_file, 'r', encoding='utf-8') as f: steps = json.load(f)
+                            script = self.load_script(script_file)
                             self.loop_counters = {} 
-                            self.execute_steps(steps, engine_bridge, variables=task_vars)
+                            if script is not None: self.execute_steps(script, engine_bridge, variables=task_vars)
                         except Exception as e:
                              self.log_signal.emit(f"❌ 預約任務失敗: {e}")
+                    self.log_vision_stats()
                     
                     self.current_priority = 999 
                     continue 
@@ -539,15 +680,16 @@ class ScriptRunner(QThread):
                 
                 if os.path.exists(script_file):
                     try:
-                        with open(script_file, 'r', encoding='utf-8') as f: steps = json.load(f)
+                        script = self.load_script(script_file)
                         self.loop_counters = {} 
-                        self.execute_steps(steps, engine_bridge)
+                        if script is not None: self.execute_steps(script, engine_bridge)
                         task_to_run['last_run'] = time.time()
-                        if task_to_run.get('mode') == 1:
+                        if script is not None and task_to_run.get('mode') == 1:
                             task_to_run['last_success_date'] = today_str 
                             self.log_signal.emit(f"✅ 時段任務已完成 ({task_to_run['sch_start']}~{task_to_run['sch_end']})")
                     except Exception as e:
                         self.log_signal.emit(f"❌ 失敗 {script_file}: {e}")
+                self.log_vision_stats()
                 
                 self.current_priority = 999 
                 
@@ -561,6 +703,7 @@ class ScriptRunner(QThread):
                     if not self.is_running: break
                     else: continue
                 
+        self.vision.release_grabber()
         self.finished_signal.emit()
     
     def stop(self): self.is_running = False
\ No newline at end of file
@@ -1,11 +1,15 @@
 # main.py
 import sys
 import os
+import multiprocessing
 
 # 1. 先單獨引入 QApplication
 from PySide6.QtWidgets import QApplication
 
 if __name__ == "__main__":
+    # OCR 工作行程池使用 spawn，打包成 exe 時子行程需要這行才不會重開一份主程式
+    multiprocessing.freeze_support()
+
     # 2. ★ 關鍵步驟：在引入任何後端邏輯之前，先建立 Qt 應用程式
     # 這樣 Qt 就能搶先設定好 DPI，不會被 pyautogui 搶走
     app = QApplication(sys.argv)